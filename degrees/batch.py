@@ -0,0 +1,91 @@
+import csv
+import json
+import multiprocessing
+import sys
+
+import degrees
+
+
+def main():
+    if len(sys.argv) < 2 or len(sys.argv) > 4:
+        sys.exit("Usage: python batch.py pairs.csv [directory] [processes]")
+    filename = sys.argv[1]
+    directory = sys.argv[2] if len(sys.argv) > 2 else "large"
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(directory)
+    print("Data loaded.", file=sys.stderr)
+
+    # Group resolved pairs by source so each source needs one search
+    queries = {}
+    with open(filename, encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if len(row) != 2 or row == ["source", "target"]:
+                continue
+            source, source_error = resolve(row[0])
+            target, target_error = resolve(row[1])
+            error = source_error or target_error
+            if error is not None:
+                emit({"source": row[0], "target": row[1], "error": error})
+                continue
+            queries.setdefault(source, []).append((row[0], row[1], target))
+
+    with multiprocessing.Pool(processes, initializer=start_worker,
+                              initargs=(directory,)) as pool:
+        for records in pool.imap(search, queries.items()):
+            for record in records:
+                emit(record)
+
+
+def start_worker(directory):
+    """
+    Makes the graph available in a worker process. Forked workers
+    inherit the parent's graph; others map the dataset snapshot.
+    """
+    if not len(degrees.graph.person_ids):
+        degrees.load_data(directory)
+
+
+def search(query):
+    """
+    Answers every pair sharing one source with a single search,
+    returning one output record per pair.
+    """
+    source, pairs = query
+    paths = degrees.shortest_paths_from(
+        source, [target for _, _, target in pairs]
+    )
+    records = []
+    for source_name, target_name, target in pairs:
+        path = paths[target]
+        records.append({
+            "source": source_name,
+            "target": target_name,
+            "degrees": None if path is None else len(path),
+            "path": path,
+        })
+    return records
+
+
+def resolve(name):
+    """
+    Returns (person_id, None) for an IMDb person ID or an unambiguous
+    name, or (None, error message) otherwise.
+    """
+    if name in degrees.graph.person_index:
+        return name, None
+    people = degrees.graph.name_index.lookup(name)
+    if len(people) == 0:
+        return None, "Person not found."
+    elif len(people) > 1:
+        return None, "Ambiguous name, use a person ID."
+    return degrees.graph.person_ids[people[0]], None
+
+
+def emit(record):
+    print(json.dumps(record), flush=True)
+
+
+if __name__ == "__main__":
+    main()
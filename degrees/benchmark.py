@@ -0,0 +1,57 @@
+import random
+import sys
+import time
+
+import degrees
+
+
+def main():
+    if len(sys.argv) > 4:
+        sys.exit("Usage: python benchmark.py [directory] [queries] [seed]")
+    directory = sys.argv[1] if len(sys.argv) > 1 else "large"
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+    print("Loading data...")
+    degrees.load_data(directory)
+    print("Data loaded.")
+
+    # only people who starred in something can be connected to anyone
+    graph = degrees.graph
+    candidates = [
+        graph.person_ids[person] for person in range(len(graph.person_ids))
+        if len(graph.movies_for(person))
+    ]
+    rng = random.Random(seed)
+    pairs = []
+    while len(pairs) < queries:
+        source, target = rng.choice(candidates), rng.choice(candidates)
+        if source != target:
+            pairs.append((source, target))
+
+    searches = [
+        ("breadth-first", degrees.breadth_first_path),
+        ("bidirectional", degrees.shortest_path),
+    ]
+    totals = {name: {"expanded": 0, "seconds": 0.0} for name, _ in searches}
+    for source, target in pairs:
+        lengths = {}
+        for name, search in searches:
+            stats = {}
+            start = time.perf_counter()
+            path = search(source, target, stats)
+            totals[name]["seconds"] += time.perf_counter() - start
+            totals[name]["expanded"] += stats["expanded"]
+            lengths[name] = None if path is None else len(path)
+        if len(set(lengths.values())) != 1:
+            sys.exit(f"Searches disagree for {source} -> {target}: {lengths}")
+
+    print(f"{queries} queries on {directory}")
+    for name, _ in searches:
+        expanded = totals[name]["expanded"]
+        seconds = totals[name]["seconds"]
+        print(f"  {name}: {expanded} nodes expanded, {seconds:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import random
+from array import array
+
+from graph import file_header, map_file
+from landmarks import UNREACHABLE, distances_from
+
+# file layout: magic, byte order, fingerprint, component per person
+MAGIC = b"DEGCOMP1"
+
+
+def label_components(graph):
+    """
+    Returns an array giving each person a connected component number,
+    numbered from 0 in order of each component's first person.
+
+    People are merged with union-find, one union per co-star
+    of each movie, without searching the graph.
+    """
+    size = len(graph.person_ids)
+    parents = array("i", range(size))
+    sizes = array("i", [1]) * size
+
+    def find(person):
+        while parents[person] != person:
+            # path halving keeps the trees shallow
+            parents[person] = parents[parents[person]]
+            person = parents[person]
+        return person
+
+    for movie in range(len(graph.movie_ids)):
+        stars = graph.stars_for(movie)
+        if not len(stars):
+            continue
+        first = find(stars[0])
+        for star in stars[1:]:
+            root = find(star)
+            if root == first:
+                continue
+            # attach the smaller tree below the larger one
+            if sizes[root] > sizes[first]:
+                first, root = root, first
+            parents[root] = first
+            sizes[first] += sizes[root]
+
+    labels = array("i", [-1]) * size
+    numbers = {}
+    for person in range(size):
+        root = find(person)
+        if root not in numbers:
+            numbers[root] = len(numbers)
+        labels[person] = numbers[root]
+    return labels
+
+
+def save_components(path, fingerprint, labels):
+    """
+    Writes component labels to `path`, tagged with the dataset `fingerprint`.
+    """
+    with open(path, "wb") as f:
+        f.write(file_header(MAGIC, fingerprint))
+        labels.tofile(f)
+
+
+def load_components(path, fingerprint):
+    """
+    Returns the component labels memory-mapped from `path`, or None if
+    they are missing or were computed for a different dataset.
+    """
+    mapped = map_file(path, MAGIC, fingerprint)
+    if mapped is None:
+        return None
+    buffer, position = mapped
+    return memoryview(buffer)[position:].cast("i")
+
+
+def degree_histogram(graph):
+    """
+    Returns a dict mapping each number of distinct co-stars
+    to how many people have that many.
+    """
+    histogram = {}
+    for person in range(len(graph.person_ids)):
+        costars = {costar for _, costar in graph.neighbors(person)}
+        costars.discard(person)
+        histogram[len(costars)] = histogram.get(len(costars), 0) + 1
+    return histogram
+
+
+def sample_eccentricities(graph, samples, seed=0):
+    """
+    Returns (person, eccentricity) pairs for `samples` people picked at
+    random among those in a movie, where eccentricity is the greatest
+    distance from that person to anyone they are connected to.
+    """
+    candidates = [
+        person for person in range(len(graph.person_ids))
+        if len(graph.movies_for(person))
+    ]
+    rng = random.Random(seed)
+    eccentricities = []
+    for person in rng.sample(candidates, min(samples, len(candidates))):
+        distances = distances_from(graph, person)
+        eccentricities.append((person, max(
+            distance for distance in distances if distance != UNREACHABLE
+        )))
+    return eccentricities
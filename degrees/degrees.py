@@ -1,58 +1,141 @@
 import csv
+import itertools
+import os
 import sys
 
+from components import (degree_histogram, label_components, load_components,
+                        sample_eccentricities, save_components)
+from graph import CostarGraph, load_snapshot
+from landmarks import build_index, load_index
 from util import Node, StackFrontier, QueueFrontier
 
-# Maps names to a set of corresponding person_ids
-names = {}
+# Integer-indexed people, movies and the stars relation between them
+graph = CostarGraph()
 
-# Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
-people = {}
+# Number of stars.csv rows parsed at a time
+STARS_CHUNK = 65536
 
-# Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
-movies = {}
+# Binary snapshot of the parsed graph, kept in the dataset directory
+SNAPSHOT = "degrees.snapshot"
+
+# Optional landmark distance index, kept in the dataset directory
+LANDMARKS = "landmarks.index"
+
+# Optional connected component labels, kept in the dataset directory
+COMPONENTS = "components.index"
+
+# Directory the current graph was loaded from
+dataset = None
+
+# Landmark index for the current graph, loaded on first use
+landmarks = None
+landmarks_loaded = False
+
+# Component label of each person for the current graph, loaded on first use
+components = None
+components_loaded = False
 
 
 def load_data(directory):
     """
     Load data from CSV files into memory.
+
+    The parsed graph is saved as a binary snapshot in `directory` and
+    memory-mapped back on later runs, until any of the CSV files change.
     """
+    global graph, dataset, landmarks, landmarks_loaded
+    global components, components_loaded
+    dataset = directory
+    landmarks = None
+    landmarks_loaded = False
+    components = None
+    components_loaded = False
+    snapshot = os.path.join(directory, SNAPSHOT)
+    fingerprint = dataset_fingerprint(directory)
+    graph = load_snapshot(snapshot, fingerprint)
+    if graph is not None:
+        return
+    graph = CostarGraph()
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
+            graph.add_person(row["id"], row["name"], row["birth"])
 
     # Load movies
     with open(f"{directory}/movies.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
+            graph.add_movie(row["id"], row["title"], row["year"])
 
-    # Load stars
+    # Load stars a chunk at a time, counting rows with unknown ids
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+        reader = csv.reader(f)
+        header = next(reader)
+        person_column = header.index("person_id")
+        movie_column = header.index("movie_id")
+        while True:
+            chunk = list(itertools.islice(reader, STARS_CHUNK))
+            if not chunk:
+                break
+            graph.add_stars(
+                (row[person_column], row[movie_column]) for row in chunk
+            )
+    graph.freeze()
+
+    # a read-only dataset directory just means no snapshot next time
+    try:
+        graph.save(snapshot, fingerprint)
+    except OSError:
+        pass
+
+
+def landmark_index():
+    """
+    Returns the landmark index saved next to the loaded dataset,
+    or None if it has not been built for this data.
+    """
+    global landmarks, landmarks_loaded
+    if not landmarks_loaded:
+        landmarks = load_index(os.path.join(dataset, LANDMARKS),
+                               dataset_fingerprint(dataset))
+        landmarks_loaded = True
+    return landmarks
+
+
+def component_index():
+    """
+    Returns the component label of each person in the loaded dataset,
+    or None if they have not been computed for this data.
+    """
+    global components, components_loaded
+    if not components_loaded:
+        components = load_components(os.path.join(dataset, COMPONENTS),
+                                     dataset_fingerprint(dataset))
+        components_loaded = True
+    return components
+
+
+def dataset_fingerprint(directory):
+    """
+    Returns the size and modification time of each CSV file in
+    `directory`, which identifies the data a snapshot was built from.
+    """
+    fingerprint = []
+    for filename in ("people.csv", "movies.csv", "stars.csv"):
+        status = os.stat(os.path.join(directory, filename))
+        fingerprint.extend((status.st_size, status.st_mtime_ns))
+    return tuple(fingerprint)
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "landmarks":
+        build_landmarks()
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "stats":
+        graph_statistics()
+        return
     if len(sys.argv) > 2:
         sys.exit("Usage: python degrees.py [directory]")
     directory = sys.argv[1] if len(sys.argv) == 2 else "large"
@@ -61,6 +144,9 @@ def main():
     print("Loading data...")
     load_data(directory)
     print("Data loaded.")
+    if graph.dangling:
+        print(f"Skipped {graph.dangling} star rows "
+              "with unknown people or movies.")
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -78,19 +164,311 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = graph.person_names[graph.person_index[path[i][1]]]
+            person2 = graph.person_names[graph.person_index[path[i + 1][1]]]
+            movie = graph.movie_titles[graph.movie_index[path[i + 1][0]]]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def build_landmarks():
+    """
+    Builds and saves the landmark index for a dataset directory.
+    """
+    if len(sys.argv) > 4:
+        sys.exit("Usage: python degrees.py landmarks [directory] [count]")
+    directory = sys.argv[2] if len(sys.argv) > 2 else "large"
+    count = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+
+    print("Loading data...")
+    load_data(directory)
+    print("Data loaded.")
+    print(f"Measuring distances from {count} landmarks...")
+    index = build_index(graph, count)
+    index.save(os.path.join(directory, LANDMARKS),
+               dataset_fingerprint(directory))
+    print("Landmark index saved.")
+
+
+def graph_statistics():
+    """
+    Prints component, degree and eccentricity statistics for a dataset
+    directory, and saves each person's component label next to it.
+    """
+    if len(sys.argv) > 4:
+        sys.exit("Usage: python degrees.py stats [directory] [samples]")
+    directory = sys.argv[2] if len(sys.argv) > 2 else "large"
+    samples = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    print("Loading data...")
+    load_data(directory)
+    print("Data loaded.")
+    print(f"{len(graph.person_ids)} people, {len(graph.movie_ids)} movies.")
+
+    labels = label_components(graph)
+    save_components(os.path.join(directory, COMPONENTS),
+                    dataset_fingerprint(directory), labels)
+    sizes = {}
+    for label in labels:
+        sizes[label] = sizes.get(label, 0) + 1
+    print(f"{len(sizes)} connected components, "
+          f"largest has {max(sizes.values(), default=0)} people.")
+
+    # group co-star counts into powers of two
+    print("Co-stars per person:")
+    buckets = {}
+    for degree, count in degree_histogram(graph).items():
+        bucket = 0 if degree == 0 else 2 ** (degree.bit_length() - 1)
+        buckets[bucket] = buckets.get(bucket, 0) + count
+    for bucket in sorted(buckets):
+        high = max(bucket * 2 - 1, bucket)
+        print(f"  {bucket}-{high}: {buckets[bucket]}")
+
+    print("Eccentricity of sampled people:")
+    for person, eccentricity in sample_eccentricities(graph, samples):
+        name = graph.person_names[person]
+        print(f"  {name} ({graph.person_ids[person]}): {eccentricity}")
+
+
+def shortest_path(source, target, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+
+    Searches breadth-first from both the source and the target at once,
+    always expanding a whole layer of the smaller frontier, and stops as
+    soon as the two searches meet. If `stats` is a dict, the number of
+    expanded nodes is stored under "expanded".
+
+    When a landmark index has been built for the dataset, people who
+    cannot lie on a short enough path are never expanded, and once
+    component labels have been saved, people in different components
+    are reported as not connected without searching.
     """
+    path = bidirectional_search(graph.person_index[source],
+                                graph.person_index[target], stats,
+                                landmark_index(), component_index())
+    return graph.external_path(path)
+
+
+def degrees_of_separation(source, target):
+    """
+    Returns the length of the shortest path between two person_ids,
+    or None if they are not connected.
+
+    Answers from the landmark index alone when its lower and upper
+    bounds agree, and searches otherwise.
+    """
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+    if source == target:
+        return 0
+    index = landmark_index()
+    if index is not None:
+        target_distances = index.distances_from(target)
+        lower = index.lower_bound(source, target_distances)
+        if lower is None:
+            return None
+        upper = index.upper_bound(index.distances_from(source),
+                                  target_distances)
+        if lower == upper:
+            return lower
+    path = bidirectional_search(source, target, None, index,
+                                component_index())
+    return None if path is None else len(path)
+
+
+def bidirectional_search(source, target, stats=None, index=None,
+                         labels=None):
+    """
+    Returns the shortest list of (movie, person) index pairs
+    that connect the source index to the target index, or None.
+
+    If a landmark `index` is given, it rules out unconnected pairs
+    up front and prunes people too far from the other end. If component
+    `labels` are given, pairs in different components are rejected
+    before searching.
+    """
+    if stats is not None:
+        stats["expanded"] = 0
+    if source == target:
+        return []
+    if labels is not None and labels[source] != labels[target]:
+        return None
+
+    bound = None
+    source_distances = target_distances = None
+    if index is not None:
+        source_distances = index.distances_from(source)
+        target_distances = index.distances_from(target)
+        if index.lower_bound(source, target_distances) is None:
+            return None
+        bound = index.upper_bound(source_distances, target_distances)
+    forward_depth = 0
+    backward_depth = 0
+
+    # nodes reached so far from each end, keyed by state
+    forward = {source: Node(state=source, parent=None, action=None)}
+    backward = {target: Node(state=target, parent=None, action=None)}
+    forward_frontier = QueueFrontier()
+    forward_frontier.add(forward[source])
+    backward_frontier = QueueFrontier()
+    backward_frontier.add(backward[target])
+
+    while not forward_frontier.empty() and not backward_frontier.empty():
+        # grow the side with less work left on its current layer
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_depth += 1
+            keep = within_bound(index, forward_depth, target_distances, bound)
+            meeting = expand_layer(forward_frontier, forward, backward,
+                                   stats, keep)
+            if meeting is not None:
+                current, action, state = meeting
+                return join_paths(forward[current.state], action,
+                                  state, backward[state])
+        else:
+            backward_depth += 1
+            keep = within_bound(index, backward_depth, source_distances, bound)
+            meeting = expand_layer(backward_frontier, backward, forward,
+                                   stats, keep)
+            if meeting is not None:
+                current, action, state = meeting
+                return join_paths(forward[state], action,
+                                  current.state, current)
+
+    # one side ran out of people to explore
+    return None
+
+
+def within_bound(index, depth, distances, bound):
+    """
+    Returns a test for whether a person first reached at `depth` can
+    still be on a path of at most `bound` steps to the person with
+    landmark `distances`, or None if there is no index to prune with.
+    """
+    if index is None:
+        return None
+
+    def keep(person):
+        remaining = index.lower_bound(person, distances)
+        if remaining is None:
+            return False
+        return bound is None or depth + remaining <= bound
+    return keep
+
+
+def expand_layer(frontier, reached, other, stats=None, keep=None):
+    """
+    Expands every node currently in `frontier` by one step, adding newly
+    reached people to `reached` and to the frontier for the next layer.
+    People for whom `keep` returns False are left out.
+
+    Returns a (node, movie, person) triple for the first edge that
+    reaches a person already in `other`, or None if the searches have
+    not met yet.
+    """
+    meeting = None
+    # only the nodes queued before this call belong to the current layer
+    for _ in range(len(frontier)):
+        current = frontier.remove()
+        if stats is not None:
+            stats["expanded"] += 1
+        for action, state in graph.neighbors(current.state):
+            if state in other:
+                # every meeting on this layer has the same length,
+                # so the first one found is a shortest path
+                meeting = (current, action, state)
+                break
+            if state not in reached and (keep is None or keep(state)):
+                reached[state] = Node(state=state, parent=current,
+                                      action=action)
+                frontier.add(reached[state])
+        if meeting is not None:
+            break
+    return meeting
+
+
+def join_paths(forward_node, action, state, backward_node):
+    """
+    Builds the (movie, person) path from the source to the target,
+    given the forward search node, the movie linking it to `state`, and
+    the backward search node for `state`.
+    """
+    path = []
+    # walk back to the source, then reverse
+    node = forward_node
+    while node.parent is not None:
+        path.append((node.action, node.state))
+        node = node.parent
+    path.reverse()
+    path.append((action, state))
+    # walk forward to the target along the backward search tree
+    node = backward_node
+    while node.parent is not None:
+        path.append((node.action, node.parent.state))
+        node = node.parent
+    return path
+
+
+def shortest_paths_from(source, targets):
+    """
+    Returns a dict mapping each person_id in `targets` to the shortest
+    list of (movie_id, person_id) pairs from the source, or to None if
+    it is not connected to the source.
+
+    All targets share one breadth-first search tree, which stops
+    growing as soon as every target has been reached.
+    """
+    start = graph.person_index[source]
+    remaining = {graph.person_index[target] for target in targets} - {start}
+
+    # targets in other components can never be reached
+    labels = component_index()
+    if labels is not None:
+        remaining = {
+            person for person in remaining if labels[person] == labels[start]
+        }
+    reached = {start: Node(state=start, parent=None, action=None)}
+    frontier = QueueFrontier()
+    frontier.add(reached[start])
+    while remaining and not frontier.empty():
+        current = frontier.remove()
+        for action, state in graph.neighbors(current.state):
+            if state not in reached:
+                reached[state] = Node(state=state, parent=current,
+                                      action=action)
+                frontier.add(reached[state])
+                remaining.discard(state)
+
+    paths = {}
+    for target in targets:
+        node = reached.get(graph.person_index[target])
+        if node is None:
+            paths[target] = None
+            continue
+        path = []
+        while node.parent is not None:
+            path.append((node.action, node.state))
+            node = node.parent
+        path.reverse()
+        paths[target] = graph.external_path(path)
+    return paths
+
+
+def breadth_first_path(source, target, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching outward
+    from the source only.
+
+    If no possible path, returns None. Kept as the baseline that
+    `shortest_path` is benchmarked against.
+    """
+    if stats is not None:
+        stats["expanded"] = 0
+    source = graph.person_index[source]
+    target = graph.person_index[target]
 
     # array to store path
     path = []
@@ -100,9 +478,9 @@ def shortest_path(source, target):
     frontier = QueueFrontier()
     # start with a frontier that contains initial state
     start = Node(state = source, parent = None, action = None)
-    for action, state in neighbors_for_person(source):
+    for action, state in graph.neighbors(source):
         if state == target:
-            return (action,state)
+            return graph.external_path([(action, state)])
         frontier.add(Node(state, start, action))
         
     while True:
@@ -111,11 +489,13 @@ def shortest_path(source, target):
             return None
         # remove a node from the frontier
         current = frontier.remove()
+        if stats is not None:
+            stats["expanded"] += 1
         # adding current state to explored set
         explored_set.add(current.state)
         
         # checking if goal state is present in neighbors
-        for action,state in neighbors_for_person(current.state):
+        for action,state in graph.neighbors(current.state):
             if state == target:
                 node = Node(state, current, action)
                 while node.parent is not None:
@@ -123,29 +503,28 @@ def shortest_path(source, target):
                     node = node.parent
                 # reversing to get the order from source to target
                 path.reverse()
-                return path
+                return graph.external_path(path)
                 # if not already in frontier or explored set add state to frontier
             if (not frontier.contains_state(state) and state not in explored_set):   
                 frontier.add(Node(state=state,parent=current,action=action))
 
-    # TODO
-    raise NotImplementedError
-
 
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    person_ids = [
+        graph.person_ids[person] for person in graph.name_index.lookup(name)
+    ]
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
+            person = graph.person_index[person_id]
+            name = graph.person_names[person]
+            birth = graph.person_births[person]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
         try:
             person_id = input("Intended Person ID: ")
@@ -163,11 +542,9 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
     neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
+    for movie, person in graph.neighbors(graph.person_index[person_id]):
+        neighbors.add((graph.movie_ids[movie], graph.person_ids[person]))
     return neighbors
 
 
@@ -0,0 +1,380 @@
+import bisect
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+# snapshot file layout: magic, byte order, fingerprint, section table, sections
+MAGIC = b"DEGRAPH2"
+
+# string attributes stored in snapshots, in file order
+STRING_TABLES = [
+    "person_ids", "person_names", "person_births",
+    "movie_ids", "movie_titles", "movie_years",
+]
+
+
+class CostarGraph():
+    """
+    People and movies interned to dense integer indices, with the
+    person <-> movie "starred in" relation stored as two compressed
+    sparse row (CSR) adjacency arrays.
+
+    Rows for person p are person_movies[person_offsets[p]:person_offsets[p + 1]]
+    and rows for movie m are movie_people[movie_offsets[m]:movie_offsets[m + 1]].
+    """
+
+    def __init__(self):
+        # IMDb id <-> index tables and per-index attributes
+        self.person_ids = []
+        self.person_names = []
+        self.person_births = []
+        self.person_index = {}
+        self.movie_ids = []
+        self.movie_titles = []
+        self.movie_years = []
+        self.movie_index = {}
+
+        # star rows collected until freeze() builds the CSR arrays,
+        # and the number of rows skipped for naming unknown ids
+        self.star_people = array("i")
+        self.star_movies = array("i")
+        self.dangling = 0
+
+        self.person_offsets = array("q", [0])
+        self.person_movies = array("i")
+        self.movie_offsets = array("q", [0])
+        self.movie_people = array("i")
+        self.name_index = NameIndex([], array("i"))
+
+        # mmap backing the arrays when loaded from a snapshot
+        self.snapshot = None
+
+    def add_person(self, person_id, name, birth):
+        self.person_index[person_id] = len(self.person_ids)
+        self.person_ids.append(person_id)
+        self.person_names.append(name)
+        self.person_births.append(birth)
+
+    def add_movie(self, movie_id, title, year):
+        self.movie_index[movie_id] = len(self.movie_ids)
+        self.movie_ids.append(movie_id)
+        self.movie_titles.append(title)
+        self.movie_years.append(year)
+
+    def add_stars(self, rows):
+        """
+        Records (person_id, movie_id) rows of who starred in what,
+        skipping and counting rows that name an unknown id.
+        """
+        person_index = self.person_index
+        movie_index = self.movie_index
+        people = array("i")
+        movies = array("i")
+        for person_id, movie_id in rows:
+            person = person_index.get(person_id)
+            movie = movie_index.get(movie_id)
+            if person is None or movie is None:
+                self.dangling += 1
+                continue
+            people.append(person)
+            movies.append(movie)
+        self.star_people.extend(people)
+        self.star_movies.extend(movies)
+
+    def freeze(self):
+        """
+        Builds the CSR adjacency arrays from the collected star rows.
+        """
+        self.person_offsets, self.person_movies = compress(
+            self.star_people, self.star_movies, len(self.person_ids)
+        )
+        self.movie_offsets, self.movie_people = compress(
+            self.star_movies, self.star_people, len(self.movie_ids)
+        )
+        self.star_people = array("i")
+        self.star_movies = array("i")
+        self.name_index = NameIndex.build(self.person_names)
+
+    def movies_for(self, person):
+        return self.person_movies[
+            self.person_offsets[person]:self.person_offsets[person + 1]
+        ]
+
+    def stars_for(self, movie):
+        return self.movie_people[
+            self.movie_offsets[movie]:self.movie_offsets[movie + 1]
+        ]
+
+    def neighbors(self, person):
+        """
+        Yields (movie, person) index pairs for everyone who starred
+        in a movie with `person`, including `person` themselves.
+        """
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_people = self.movie_people
+        for i in range(self.person_offsets[person],
+                       self.person_offsets[person + 1]):
+            movie = person_movies[i]
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                yield movie, movie_people[j]
+
+    def save(self, path, fingerprint):
+        """
+        Writes the frozen graph to a binary snapshot at `path`, tagged
+        with `fingerprint` (a tuple of ints describing the source data).
+        """
+        sections = [
+            self.person_offsets, self.person_movies,
+            self.movie_offsets, self.movie_people,
+        ]
+        for name in STRING_TABLES:
+            sections.extend(encode_strings(getattr(self, name)))
+        for ids in (self.person_ids, self.movie_ids):
+            sections.append(
+                array("i", sorted(range(len(ids)), key=ids.__getitem__))
+            )
+        sections.extend(encode_strings(self.name_index.keys))
+        sections.append(self.name_index.people)
+        sections.append(array("q", [self.dangling]))
+
+        header = file_header(MAGIC, fingerprint)
+        table_size = struct.calcsize("<I") + struct.calcsize("<2q") * len(sections)
+        offset = aligned(len(header) + table_size)
+        table = [struct.pack("<I", len(sections))]
+        for section in sections:
+            size = len(section) * section.itemsize
+            table.append(struct.pack("<2q", offset, size))
+            offset = aligned(offset + size)
+
+        # write to a temporary file first so readers never see a partial file
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(header)
+            f.write(b"".join(table))
+            for section in sections:
+                f.write(bytes(aligned(f.tell()) - f.tell()))
+                section.tofile(f)
+        os.replace(temporary, path)
+
+    def external_path(self, path):
+        """
+        Converts a path of (movie, person) index pairs
+        to (movie_id, person_id) pairs.
+        """
+        if path is None:
+            return None
+        return [
+            (self.movie_ids[movie], self.person_ids[person])
+            for movie, person in path
+        ]
+
+
+def compress(rows, cols, size):
+    """
+    Returns (offsets, targets) CSR arrays for the (row, col) pairs,
+    with duplicate pairs removed and each row sorted.
+    """
+    # count entries per row, then turn the counts into row starts
+    offsets = array("q", bytes(8 * (size + 1)))
+    for row in rows:
+        offsets[row + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+
+    targets = array("i", bytes(4 * len(cols)))
+    cursor = offsets[:-1]
+    for row, col in zip(rows, cols):
+        targets[cursor[row]] = col
+        cursor[row] += 1
+
+    # drop repeated rows of the same pair, compacting in place
+    end = 0
+    start = 0
+    for i in range(size):
+        row = sorted(set(targets[start:offsets[i + 1]]))
+        start = offsets[i + 1]
+        targets[end:end + len(row)] = array("i", row)
+        end += len(row)
+        offsets[i + 1] = end
+    del targets[end:]
+    return offsets, targets
+
+
+class StringTable():
+    """
+    Read-only sequence of strings kept as UTF-8 in a single buffer,
+    decoded on access.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+class StringIndex():
+    """
+    Maps strings of a StringTable back to their positions, by binary
+    search over the positions sorted by string.
+    """
+
+    def __init__(self, table, order):
+        self.table = table
+        self.order = order
+
+    def find(self, key):
+        table = self.table
+        order = self.order
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            if table[order[middle]] < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(order) and table[order[low]] == key:
+            return order[low]
+        return None
+
+    def __getitem__(self, key):
+        position = self.find(key)
+        if position is None:
+            raise KeyError(key)
+        return position
+
+    def __contains__(self, key):
+        return self.find(key) is not None
+
+    def get(self, key, default=None):
+        position = self.find(key)
+        return default if position is None else position
+
+
+class NameIndex():
+    """
+    Lowercased person names in sorted order alongside the person each
+    belongs to, for exact and prefix lookups by binary search.
+    """
+
+    def __init__(self, keys, people):
+        self.keys = keys
+        self.people = people
+
+    @classmethod
+    def build(cls, names):
+        order = sorted(range(len(names)), key=lambda i: names[i].lower())
+        return cls([names[i].lower() for i in order], array("i", order))
+
+    def lookup(self, name):
+        """
+        Returns the people whose name is `name`, ignoring case.
+        """
+        key = name.lower()
+        start = bisect.bisect_left(self.keys, key)
+        end = bisect.bisect_right(self.keys, key, start)
+        return list(self.people[start:end])
+
+    def prefixed(self, prefix, limit=None):
+        """
+        Returns up to `limit` people whose name starts with `prefix`,
+        ignoring case, in name order.
+        """
+        key = prefix.lower()
+        start = bisect.bisect_left(self.keys, key)
+        end = bisect.bisect_left(self.keys, key + chr(0x10FFFF), start)
+        if limit is not None:
+            end = min(end, start + limit)
+        return list(self.people[start:end])
+
+
+def load_snapshot(path, fingerprint):
+    """
+    Returns the CostarGraph memory-mapped from the snapshot at `path`,
+    or None if there is no snapshot or it was written for a different
+    `fingerprint` or machine byte order.
+    """
+    mapped = map_file(path, MAGIC, fingerprint)
+    if mapped is None:
+        return None
+    buffer, position = mapped
+
+    (count,) = struct.unpack_from("<I", buffer, position)
+    position += struct.calcsize("<I")
+    view = memoryview(buffer)
+    sections = []
+    for _ in range(count):
+        offset, size = struct.unpack_from("<2q", buffer, position)
+        position += struct.calcsize("<2q")
+        sections.append(view[offset:offset + size])
+
+    graph = CostarGraph()
+    graph.snapshot = buffer
+    graph.person_offsets = sections[0].cast("q")
+    graph.person_movies = sections[1].cast("i")
+    graph.movie_offsets = sections[2].cast("q")
+    graph.movie_people = sections[3].cast("i")
+    for i, name in enumerate(STRING_TABLES):
+        offsets = sections[4 + 2 * i].cast("q")
+        setattr(graph, name, StringTable(offsets, sections[5 + 2 * i]))
+    order = 4 + 2 * len(STRING_TABLES)
+    graph.person_index = StringIndex(graph.person_ids, sections[order].cast("i"))
+    graph.movie_index = StringIndex(graph.movie_ids, sections[order + 1].cast("i"))
+    graph.name_index = NameIndex(
+        StringTable(sections[order + 2].cast("q"), sections[order + 3]),
+        sections[order + 4].cast("i"),
+    )
+    graph.dangling = sections[order + 5].cast("q")[0]
+    return graph
+
+
+def file_header(magic, fingerprint):
+    """
+    Returns the header that starts every data file: the format's magic
+    bytes, the machine byte order and the dataset fingerprint.
+    """
+    return magic + sys.byteorder[0].encode() + struct.pack(
+        f"<I{len(fingerprint)}q", len(fingerprint), *fingerprint
+    )
+
+
+def map_file(path, magic, fingerprint):
+    """
+    Memory-maps the data file at `path` and returns (buffer, offset of
+    the data after its header), or None if the file is missing or its
+    header does not match `magic` and `fingerprint`.
+    """
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    header = file_header(magic, fingerprint)
+    if buffer[:len(header)] != header:
+        return None
+    return buffer, len(header)
+
+
+def encode_strings(strings):
+    """
+    Returns (offsets, blob) arrays holding `strings` as UTF-8.
+    """
+    offsets = array("q", [0])
+    blob = array("B")
+    for string in strings:
+        blob.frombytes(string.encode("utf-8"))
+        offsets.append(len(blob))
+    return offsets, blob
+
+
+def aligned(offset):
+    return (offset + 7) // 8 * 8
@@ -0,0 +1,132 @@
+import struct
+from array import array
+from collections import deque
+
+from graph import aligned, file_header, map_file
+
+# file layout: magic, byte order, fingerprint, sizes, landmarks, distances
+MAGIC = b"DEGLAND1"
+
+# distance stored for people a landmark cannot reach
+UNREACHABLE = 0xFFFF
+
+
+class LandmarkIndex():
+    """
+    Breadth-first distances from a few well-connected people (landmarks)
+    to everyone else. By the triangle inequality they bound the distance
+    between any two people from below and above without searching.
+    """
+
+    def __init__(self, landmarks, distances, size):
+        self.landmarks = landmarks
+        # distance from landmark k to person p is distances[k * size + p]
+        self.distances = distances
+        self.size = size
+        self.snapshot = None
+
+    def distances_from(self, person):
+        """
+        Returns the distance from every landmark to `person`.
+        """
+        return [
+            self.distances[k * self.size + person]
+            for k in range(len(self.landmarks))
+        ]
+
+    def lower_bound(self, person, distances):
+        """
+        Returns a lower bound on the distance from `person` to the person
+        whose landmark distances are `distances`, or None if the two
+        cannot be connected.
+        """
+        bound = 0
+        for k, distance in enumerate(distances):
+            own = self.distances[k * self.size + person]
+            if (own == UNREACHABLE) != (distance == UNREACHABLE):
+                return None
+            if distance != UNREACHABLE:
+                bound = max(bound, abs(own - distance))
+        return bound
+
+    def upper_bound(self, distances, other):
+        """
+        Returns the length of the shortest path through a landmark
+        between two people with landmark distances `distances` and
+        `other`, or None if no landmark reaches both.
+        """
+        bound = None
+        for distance, distance_other in zip(distances, other):
+            if distance != UNREACHABLE and distance_other != UNREACHABLE:
+                if bound is None or distance + distance_other < bound:
+                    bound = distance + distance_other
+        return bound
+
+    def save(self, path, fingerprint):
+        """
+        Writes the index to `path`, tagged with the dataset `fingerprint`.
+        """
+        with open(path, "wb") as f:
+            f.write(file_header(MAGIC, fingerprint))
+            f.write(struct.pack("<2q", len(self.landmarks), self.size))
+            f.write(bytes(aligned(f.tell()) - f.tell()))
+            array("i", self.landmarks).tofile(f)
+            self.distances.tofile(f)
+
+
+def build_index(graph, count):
+    """
+    Returns a LandmarkIndex over the `count` people who share
+    movies with the most co-stars.
+    """
+    size = len(graph.person_ids)
+    appearances = [
+        sum(len(graph.stars_for(movie)) for movie in graph.movies_for(person))
+        for person in range(size)
+    ]
+    landmarks = sorted(range(size), key=appearances.__getitem__,
+                       reverse=True)[:count]
+
+    distances = array("H")
+    for landmark in landmarks:
+        distances.extend(distances_from(graph, landmark))
+    return LandmarkIndex(landmarks, distances, size)
+
+
+def distances_from(graph, source):
+    """
+    Returns an array of breadth-first distances from `source` to every
+    person, with UNREACHABLE for people in other components.
+    """
+    distances = array("H", [UNREACHABLE]) * len(graph.person_ids)
+    distances[source] = 0
+    queue = deque([source])
+    while queue:
+        person = queue.popleft()
+        distance = min(distances[person] + 1, UNREACHABLE - 1)
+        for _, neighbor in graph.neighbors(person):
+            if distances[neighbor] == UNREACHABLE:
+                distances[neighbor] = distance
+                queue.append(neighbor)
+    return distances
+
+
+def load_index(path, fingerprint):
+    """
+    Returns the LandmarkIndex memory-mapped from `path`, or None if there
+    is no index or it was built for a different dataset `fingerprint`.
+    """
+    mapped = map_file(path, MAGIC, fingerprint)
+    if mapped is None:
+        return None
+    buffer, position = mapped
+    count, size = struct.unpack_from("<2q", buffer, position)
+    position = aligned(position + struct.calcsize("<2q"))
+
+    view = memoryview(buffer)
+    landmarks = view[position:position + 4 * count].cast("i")
+    position += 4 * count
+    distances = view[position:position + 2 * count * size].cast("H")
+    index = LandmarkIndex(landmarks, distances, size)
+    index.snapshot = buffer
+    return index
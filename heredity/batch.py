@@ -0,0 +1,156 @@
+import argparse
+import collections
+import functools
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+
+from heredity import MODEL, load_data
+from model import Model
+from inference import Plan, eliminate, pedigree_shape
+
+# Families handed to a worker at a time
+CHUNK = 64
+
+# Chunks waiting on workers, per worker, before reading pauses
+BACKLOG = 2
+
+# Plans kept by each worker, most recently used first
+PLANS = 256
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Infer gene and trait probabilities for many families."
+    )
+    parser.add_argument(
+        "families",
+        help="directory of family CSV files, or a JSONL file of families "
+             "(- for standard input)"
+    )
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument(
+        "--probs", metavar="FILE",
+        help="JSON file of parameters to use instead of PROBS"
+    )
+    args = parser.parse_args()
+    model = MODEL if args.probs is None else Model.load(args.probs)
+    processes = args.processes or os.cpu_count()
+
+    # Send chunks off as they are read, emitting results in order and
+    # keeping few enough in flight that memory does not grow with the
+    # input; workers keep the plans of shapes they have seen
+    families = read_families(args.families)
+    with multiprocessing.Pool(processes) as pool:
+        running = collections.deque()
+        while True:
+            chunk = list(itertools.islice(families, CHUNK))
+            if chunk:
+                running.append(pool.apply_async(infer, ((model, chunk),)))
+            while running and (not chunk or running[0].ready()
+                               or len(running) > BACKLOG * processes):
+                for record in running.popleft().get():
+                    emit(record)
+            if not chunk:
+                break
+
+
+def read_families(source):
+    """
+    Yield (name, people, error) for each family in a directory of CSV
+    files, named after the file, or in a JSONL file with one object per
+    line holding a "family" name and a list of "people", each with a
+    "name", "mother", "father" and "trait" (true, false or null).
+
+    `error` describes a family that could not be read, and is otherwise
+    None; families are read lazily, so a stream is handled as it comes.
+    """
+    if os.path.isdir(source):
+        for filename in sorted(os.listdir(source)):
+            if filename.endswith(".csv"):
+                name = os.path.splitext(filename)[0]
+                try:
+                    people = load_data(os.path.join(source, filename))
+                except (KeyError, ValueError) as e:
+                    yield name, None, f"Malformed family file: {e!r}"
+                    continue
+                yield name, people, None
+        return
+
+    f = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    with f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = None
+            try:
+                record = json.loads(line)
+                people = {}
+                for person in record["people"]:
+                    people[person["name"]] = {
+                        "name": person["name"],
+                        "mother": person.get("mother"),
+                        "father": person.get("father"),
+                        "trait": (None if person.get("trait") is None
+                                  else bool(person["trait"])),
+                    }
+            except (KeyError, TypeError, ValueError) as e:
+                family = number
+                if isinstance(record, dict):
+                    family = record.get("family", number)
+                yield family, None, f"Malformed record: {e!r}"
+                continue
+            yield record.get("family", number), people, None
+
+
+def check(people):
+    """
+    Return why a family cannot be inferred, or None if it can: everyone
+    needs both parents or neither, from within the family.
+    """
+    for name, data in people.items():
+        parents = [data["mother"], data["father"]]
+        if parents.count(None) == 1:
+            return f"{name} has only one parent."
+        for parent in parents:
+            if parent is not None and parent not in people:
+                return f"{name}'s parent {parent} is not in the family."
+    return None
+
+
+@functools.lru_cache(maxsize=PLANS)
+def plan(shape):
+    """
+    Return the Plan for families of a shape, made once per worker.
+    """
+    return Plan.from_shape(shape)
+
+
+def infer(task):
+    """
+    Infers the marginals of every family in a chunk, returning one
+    output record per family: its marginals, or why it has none.
+    """
+    model, families = task
+    records = []
+    for family, people, error in families:
+        if error is None:
+            error = check(people)
+        if error is not None:
+            records.append({"family": family, "error": error})
+            continue
+        shape = pedigree_shape(people)
+        probabilities = eliminate(people, model, plan(shape))
+        records.append({"family": family, "marginals": probabilities})
+    return records
+
+
+def emit(record):
+    print(json.dumps(record), flush=True)
+
+
+if __name__ == "__main__":
+    main()
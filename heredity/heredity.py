@@ -1,6 +1,11 @@
+import argparse
 import csv
 import itertools
-import sys
+
+from inference import Plan, eliminate, pedigree_shape
+from model import GENES, Model
+from sampling import sample_probabilities
+import vectorized
 
 PROBS = {
 
@@ -36,14 +41,103 @@ PROBS = {
     "mutation": 0.01
 }
 
+# PROBS with its tables precomputed
+MODEL = Model(PROBS)
+
 
 def main():
+    parser = argparse.ArgumentParser(
+        description="Infer gene and trait probabilities for a family."
+    )
+    parser.add_argument("data", help="CSV file of name, mother, father, trait")
+    parser.add_argument(
+        "--method",
+        choices=["eliminate", "enumerate", "pruned", "vectorized",
+                 "likelihood", "gibbs"],
+        default="eliminate",
+        help="exact inference by variable elimination over the family tree, "
+             "or by enumerating every assignment one at a time, only gene "
+             "counts with unknown traits summed out, or in vectorized "
+             "batches; or estimates by likelihood-weighted or Gibbs sampling "
+             "(Gibbs for large families or many known traits)"
+    )
+    parser.add_argument("--samples", type=int, default=10000,
+                        help="samples (or Gibbs sweeps) to estimate from")
+    parser.add_argument("--chains", type=int, default=1,
+                        help="independent sampling chains, one per process")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--probs", metavar="FILE",
+        help="JSON file of parameters to use instead of PROBS"
+    )
+    parser.add_argument(
+        "--mutation", type=float, nargs="+", metavar="RATE",
+        help="infer once for each mutation rate, keeping other parameters"
+    )
+    args = parser.parse_args()
+    people = load_data(args.data)
+    model = MODEL if args.probs is None else Model.load(args.probs)
+
+    if args.mutation is None:
+        stats = {}
+        report(people, *infer(people, model, args, stats=stats), stats)
+        return
+
+    # every rate shares the family and, for elimination, its plan
+    plan = Plan.from_shape(pedigree_shape(people))
+    for rate in args.mutation:
+        print(f"Mutation rate {rate}:")
+        stats = {}
+        report(people, *infer(people, model.with_mutation(rate), args, plan,
+                              stats), stats)
+
+
+def infer(people, model, args, plan=None, stats=None):
+    """
+    Return the distributions of `people` under a Model by the method
+    chosen in `args`, and their standard errors if they are estimates.
+    Sampling diagnostics are stored in `stats` if it is a dict.
+    """
+    if args.method in ("likelihood", "gibbs"):
+        return sample_probabilities(
+            people, model, args.method, args.samples, args.chains, args.seed,
+            stats
+        )
+    if args.method == "eliminate":
+        return eliminate(people, model, plan), None
+    if args.method == "pruned":
+        return pruned_probabilities(people, model), None
+    if args.method == "vectorized":
+        return vectorized.enumerate_probabilities(people, model), None
+    return enumerate_probabilities(people, model), None
+
+
+def report(people, probabilities, errors=None, stats=None):
+    """
+    Print the gene and trait distribution of every person, with
+    standard errors and the effective sample size if given.
+    """
+    if stats and "effective_samples" in stats:
+        print(f"Effective sample size: {stats['effective_samples']:.1f}")
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                if errors is None:
+                    print(f"    {value}: {p:.4f}")
+                else:
+                    error = errors[person][field][value]
+                    print(f"    {value}: {p:.4f} ± {error:.4f}")
 
-    # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
 
+def enumerate_probabilities(people, model=MODEL):
+    """
+    Return the gene and trait distribution of every person in `people`
+    under a Model by summing the joint probability of every assignment
+    of gene counts and traits that agrees with the known traits.
+    """
     # Keep track of gene and trait probabilities for each person
     probabilities = {
         person: {
@@ -78,20 +172,119 @@ def main():
             for two_genes in powerset(names - one_gene):
 
                 # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
+                p = joint_probability(people, one_gene, two_genes,
+                                      have_trait, model)
                 update(probabilities, one_gene, two_genes, have_trait, p)
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
+    return probabilities
 
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+
+def pruned_probabilities(people, model=MODEL):
+    """
+    Return the same distributions as `enumerate_probabilities`, but
+    enumerating gene counts only.
+
+    Known traits are fixed, so no trait assignment is ever discarded.
+    An unknown trait depends on nothing but its person's gene count and
+    its probabilities sum to 1, so it is summed out of the joint
+    probability and its distribution added up from P(trait | gene).
+
+    Gene counts are assigned depth-first, parents before children, so
+    the probability of a partial assignment is shared by every
+    assignment extending it, and impossible ones are cut off early.
+    Each person's copies are tallied from the total probability of the
+    branches below them rather than assignment by assignment.
+    """
+    names = parents_first(people)
+    column = {name: i for i, name in enumerate(names)}
+
+    # each person's probability of their copies given their parents',
+    # times the likelihood of their trait if it is known
+    factors = []
+    for name in names:
+        trait = people[name]["trait"]
+        evidence = [
+            1 if trait is None else model.trait_table[2 * copies + trait]
+            for copies in GENES
+        ]
+        if people[name]["mother"] is None and people[name]["father"] is None:
+            factors.append((None, None, [
+                model.gene_table[copies] * evidence[copies]
+                for copies in GENES
+            ]))
+        else:
+            factors.append((column[people[name]["mother"]],
+                            column[people[name]["father"]], [
+                p * evidence[i % 3]
+                for i, p in enumerate(model.inherit_table)
+            ]))
+
+    counts = [0] * len(names)
+    totals = [[0, 0, 0] for _ in names]
+
+    def descend(i, p):
+        # add up the probability of every assignment extending counts[:i]
+        if i == len(names):
+            return p
+        mother, father, table = factors[i]
+        subtotal = 0
+        for copies in GENES:
+            if mother is None:
+                q = p * table[copies]
+            else:
+                q = p * table[9 * counts[mother] + 3 * counts[father] + copies]
+            if q == 0:
+                continue
+            counts[i] = copies
+            below = descend(i + 1, q)
+            totals[i][copies] += below
+            subtotal += below
+        return subtotal
+
+    descend(0, 1)
+
+    probabilities = {}
+    for name, genes in zip(names, totals):
+        trait = people[name]["trait"]
+        if trait is None:
+            has_trait = sum(genes[copies] * model.trait_table[2 * copies + 1]
+                            for copies in GENES)
+        else:
+            has_trait = sum(genes) if trait else 0
+        probabilities[name] = {
+            "gene": {2: genes[2], 1: genes[1], 0: genes[0]},
+            "trait": {True: has_trait, False: sum(genes) - has_trait},
+        }
+    normalize(probabilities)
+    return probabilities
+
+
+def parents_first(people):
+    """
+    Return the names in `people` ordered so that everyone comes after
+    their parents.
+    """
+    order = []
+    placed = set()
+    for name in people:
+        stack = [name]
+        while stack:
+            person = stack[-1]
+            if person in placed:
+                stack.pop()
+                continue
+            parents = [people[person][parent]
+                       for parent in ("mother", "father")
+                       if people[person][parent] is not None]
+            pending = [parent for parent in parents if parent not in placed]
+            if pending:
+                stack.extend(pending)
+            else:
+                placed.add(person)
+                order.append(stack.pop())
+    return order
 
 
 def load_data(filename):
@@ -128,7 +321,8 @@ def powerset(s):
     ]
 
 
-def joint_probability(people, one_gene, two_genes, have_trait):
+def joint_probability(people, one_gene, two_genes, have_trait,
+                      model=MODEL):
     """
     Compute and return a joint probability.
 
@@ -138,6 +332,8 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone not in `one_gene` or `two_gene` does not have the gene, and
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
+
+    Probabilities come from the tables of `model`, PROBS by default.
     """
     joint_prob = 1
     for person in people:
@@ -146,29 +342,15 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         father = people[person]["father"]
         # no parent mentioned -> unconditional probability
         if mother == None and father == None:
-            inherited_probability = PROBS['gene'][copies]
-        # has parents mentioned -> conditional probability
+            inherited_probability = model.gene_table[copies]
+        # has parents mentioned -> probability given the parents' copies
         else:
-            # dictionary to store probability that parents pass on the gene to the child
-            parents_probability = {mother:0, father:0}
-            for parent in parents_probability.keys():
-                # if parent has one gene, there is 50-50 probability
-                if parent in one_gene:
-                    parents_probability[parent] = 0.5
-                # if parent has two genes, parent passes every time except when mutated
-                elif parent in two_genes:
-                    parents_probability[parent] = 1 - PROBS['mutation']
-                # if parent has none, cannot pass until mutation happens
-                else:
-                    parents_probability[parent] = PROBS['mutation']
-            if copies == 2:
-                inherited_probability = parents_probability[mother]*parents_probability[father]
-            elif copies == 1:
-                inherited_probability = (parents_probability[mother]*(1-parents_probability[father])) + (parents_probability[father]*(1-parents_probability[mother]))
-            else:
-                inherited_probability = (1-parents_probability[mother])*(1-parents_probability[father])
-        has_trait = bool(person in have_trait)
-        inherited_probability *= PROBS['trait'][copies][has_trait]
+            inherited_probability = model.inherit_table[
+                9 * num_copies(mother, one_gene, two_genes) +
+                3 * num_copies(father, one_gene, two_genes) + copies
+            ]
+        has_trait = person in have_trait
+        inherited_probability *= model.trait_table[2 * copies + has_trait]
         joint_prob *= inherited_probability
     return joint_prob
 
@@ -0,0 +1,291 @@
+import heapq
+import itertools
+
+from model import GENES
+
+
+class Factor():
+    """
+    A table of non-negative values over assignments of gene counts to
+    a tuple of `variables` (people), keyed by tuples of gene counts.
+    """
+
+    def __init__(self, variables, table):
+        self.variables = tuple(variables)
+        self.table = table
+
+    def __mul__(self, other):
+        variables = self.variables + tuple(
+            v for v in other.variables if v not in self.variables
+        )
+        mine = [variables.index(v) for v in self.variables]
+        theirs = [variables.index(v) for v in other.variables]
+        table = {}
+        for genes in itertools.product(GENES, repeat=len(variables)):
+            table[genes] = (
+                self.table[tuple(genes[i] for i in mine)] *
+                other.table[tuple(genes[i] for i in theirs)]
+            )
+        return Factor(variables, table)
+
+    def project(self, variables):
+        """
+        Return this factor summed down onto `variables`. Any of them
+        that it does not mention are ones it is constant over.
+        """
+        variables = tuple(variables)
+        kept = [v for v in variables if v in self.variables]
+        indices = [self.variables.index(v) for v in kept]
+        table = dict.fromkeys(itertools.product(GENES, repeat=len(kept)), 0)
+        for genes, p in self.table.items():
+            table[tuple(genes[i] for i in indices)] += p
+        return Factor(kept, table) * Factor(
+            [v for v in variables if v not in kept],
+            dict.fromkeys(
+                itertools.product(GENES, repeat=len(variables) - len(kept)), 1
+            )
+        )
+
+    def normalized(self):
+        """
+        Return this factor scaled to sum to 1, unless it is all zero.
+        """
+        total = sum(self.table.values()) or 1
+        return Factor(self.variables, {
+            genes: p / total for genes, p in self.table.items()
+        })
+
+
+def unit():
+    """
+    Return the factor over no variables with value 1.
+    """
+    return Factor((), {(): 1})
+
+
+def product(factors):
+    """
+    Return the product of a list of factors, or the unit factor, scaled
+    to sum to 1.
+    """
+    result = unit()
+    for factor in factors:
+        result = (result * factor).normalized()
+    return result
+
+
+def pedigree_shape(people):
+    """
+    Return the shape of a family from load_data: for each person in
+    turn, None if they have no parents, or the positions of their mother
+    and father. Families of the same shape compile to the same Plan.
+    """
+    column = {person: i for i, person in enumerate(people)}
+    return tuple(
+        None if data["mother"] is None and data["father"] is None
+        else (column[data["mother"]], column[data["father"]])
+        for data in people.values()
+    )
+
+
+def compile_pedigree(people, model):
+    """
+    Return one factor per person of `people` (as from load_data), over
+    people numbered by position: the probability of their gene count
+    given their parents' under a Model, times the probability of their
+    trait if it is known.
+    """
+    factors = []
+    for i, (data, parents) in enumerate(
+        zip(people.values(), pedigree_shape(people))
+    ):
+        trait = data["trait"]
+        evidence = [
+            1 if trait is None else model.trait_table[2 * genes + trait]
+            for genes in GENES
+        ]
+        if parents is None:
+            factors.append(Factor((i,), {
+                (genes,): model.gene_table[genes] * evidence[genes]
+                for genes in GENES
+            }))
+        else:
+            factors.append(Factor(parents + (i,), {
+                genes: model.inherit_table[k] * evidence[genes[2]]
+                for k, genes in enumerate(
+                    itertools.product(GENES, repeat=3)
+                )
+            }))
+    return factors
+
+
+def elimination_order(scopes):
+    """
+    Return the variables of factors over `scopes` (tuples of variables)
+    in a greedy min-degree elimination order, and the neighbours each
+    has when it is eliminated.
+    """
+    neighbours = {}
+    for scope in scopes:
+        for v in scope:
+            neighbours.setdefault(v, set()).update(scope)
+            neighbours[v].discard(v)
+
+    # degrees only change next to an eliminated variable, so keep them
+    # in a heap and skip entries that have gone stale
+    heap = [
+        (len(near), i, v) for i, (v, near) in enumerate(neighbours.items())
+    ]
+    heapq.heapify(heap)
+    pushed = itertools.count(len(heap))
+    order = []
+    separators = {}
+    while heap:
+        degree, _, v = heapq.heappop(heap)
+        if v not in neighbours or len(neighbours[v]) != degree:
+            continue
+        separators[v] = neighbours.pop(v)
+        for a, b in itertools.permutations(separators[v], 2):
+            neighbours[a].add(b)
+        for a in separators[v]:
+            neighbours[a].discard(v)
+            heapq.heappush(heap, (len(neighbours[a]), next(pushed), a))
+        order.append(v)
+    return order, separators
+
+
+class Plan():
+    """
+    The cliques formed by eliminating the variables of factors over a
+    list of scopes, joined into a tree. It depends only on the scopes,
+    so one plan serves every family of the same shape.
+
+    Eliminating v forms the clique of v and its separator (its neighbours
+    at the time), and hands its message to the clique of whichever
+    separator variable is eliminated next. A pedigree without marriages
+    between relatives has cliques of at most three people, so messages
+    cost a constant each and calibration is linear in its size.
+    """
+
+    def __init__(self, scopes):
+        order, separators = elimination_order(scopes)
+        rank = {v: i for i, v in enumerate(order)}
+        self.order = order
+        self.separators = {
+            v: tuple(sorted(separators[v], key=rank.get)) for v in order
+        }
+        self.parent = {
+            v: self.separators[v][0] if self.separators[v] else None
+            for v in order
+        }
+        self.children = {v: [] for v in order}
+        for v in order:
+            if self.parent[v] is not None:
+                self.children[self.parent[v]].append(v)
+
+        # each factor belongs to the clique of its first eliminated variable
+        self.cliques = [min(scope, key=rank.get) for scope in scopes]
+
+    @classmethod
+    def from_shape(cls, shape):
+        """
+        Returns the Plan for the factors of families of a shape, as
+        given by pedigree_shape.
+        """
+        return cls([
+            (i,) if parents is None else parents + (i,)
+            for i, parents in enumerate(shape)
+        ])
+
+
+class JunctionTree():
+    """
+    The product of a list of factors calibrated over the clique tree of
+    a Plan for their scopes, made here if not given.
+    """
+
+    def __init__(self, factors, plan=None):
+        if plan is None:
+            plan = Plan([factor.variables for factor in factors])
+        self.order = plan.order
+        self.separators = plan.separators
+        self.parent = plan.parent
+        self.children = plan.children
+
+        assigned = {v: [] for v in plan.order}
+        for factor, clique in zip(factors, plan.cliques):
+            assigned[clique].append(factor)
+        self.potentials = {v: product(assigned[v]) for v in plan.order}
+
+        self.up = {}
+        self.down = {}
+        self.calibrate()
+
+    def calibrate(self):
+        """
+        Pass messages from the leaves of the tree to its roots and back.
+        Only their proportions matter, so messages and products of them
+        are scaled to sum to 1 to keep large pedigrees from underflowing.
+        """
+        for v in self.order:
+            belief = product(
+                [self.potentials[v]] + [self.up[c] for c in self.children[v]]
+            )
+            self.up[v] = belief.project(self.separators[v]).normalized()
+
+        for v in reversed(self.order):
+            # messages into v, with each child's own message left out of
+            # what is sent back to it, via prefix and suffix products
+            incoming = [self.potentials[v]]
+            if self.parent[v] is not None:
+                incoming.append(self.down[v])
+            children = self.children[v]
+            prefix = [product(incoming)]
+            for c in children:
+                prefix.append((prefix[-1] * self.up[c]).normalized())
+            suffix = unit()
+            for i in reversed(range(len(children))):
+                c = children[i]
+                self.down[c] = (
+                    (prefix[i] * suffix).project(self.separators[c])
+                    .normalized()
+                )
+                suffix = (suffix * self.up[c]).normalized()
+
+    def marginal(self, v):
+        """
+        Return the normalized distribution of the gene count of `v`.
+        """
+        belief = product(
+            [self.potentials[v]] +
+            ([self.down[v]] if self.parent[v] is not None else []) +
+            [self.up[c] for c in self.children[v]]
+        ).project((v,))
+        total = sum(belief.table.values())
+        return {genes: belief.table[(genes,)] / total for genes in GENES}
+
+
+def eliminate(people, model, plan=None):
+    """
+    Return the gene and trait distribution of every person in `people`
+    given the known traits under a Model, in the same form as
+    heredity.main builds, by message passing over a junction tree of
+    the pedigree. `plan` may be a Plan already made for a family of the
+    same shape.
+    """
+    tree = JunctionTree(compile_pedigree(people, model), plan)
+    probabilities = {}
+    for i, (person, data) in enumerate(people.items()):
+        gene = tree.marginal(i)
+        if data["trait"] is None:
+            has_trait = sum(
+                gene[genes] * model.trait_table[2 * genes + 1]
+                for genes in GENES
+            )
+        else:
+            has_trait = 1 if data["trait"] else 0
+        probabilities[person] = {
+            "gene": {2: gene[2], 1: gene[1], 0: gene[0]},
+            "trait": {True: has_trait, False: 1 - has_trait},
+        }
+    return probabilities
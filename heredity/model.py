@@ -0,0 +1,88 @@
+import itertools
+import json
+
+import numpy as np
+
+# Values a gene count can take
+GENES = (0, 1, 2)
+
+
+class Model():
+    """
+    A parameter set in the form of heredity.PROBS, with its probabilities
+    computed once as arrays: `gene[g]` for a person without parents,
+    `inherit[m, f, c]` for a child's gene count given their parents',
+    and `trait[g, t]` for having the trait (t = 1) or not (t = 0) given
+    a gene count.
+
+    The same tables are kept flat as lists for loops over one assignment
+    at a time: `gene_table[g]`, `inherit_table[9 * m + 3 * f + c]` and
+    `trait_table[2 * g + t]`.
+    """
+
+    def __init__(self, probs):
+        self.probs = probs
+        self.mutation = probs["mutation"]
+        self.gene = np.array([probs["gene"][g] for g in GENES])
+        inherited = inheritance(probs)
+        self.inherit = np.array([
+            [[inherited[m, f, c] for c in GENES] for f in GENES]
+            for m in GENES
+        ])
+        self.trait = np.array([
+            [probs["trait"][g][False], probs["trait"][g][True]]
+            for g in GENES
+        ])
+        self.gene_table = self.gene.tolist()
+        self.inherit_table = self.inherit.ravel().tolist()
+        self.trait_table = self.trait.ravel().tolist()
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Returns the Model for a JSON file with the same fields as
+        heredity.PROBS, with gene counts and traits as string keys.
+        """
+        with open(filename) as f:
+            data = json.load(f)
+        return cls({
+            "gene": {int(g): p for g, p in data["gene"].items()},
+            "trait": {
+                int(g): {value == "true": p for value, p in traits.items()}
+                for g, traits in data["trait"].items()
+            },
+            "mutation": data["mutation"],
+        })
+
+    def with_mutation(self, mutation):
+        """
+        Returns a Model with these probabilities but another mutation rate.
+        """
+        return Model({**self.probs, "mutation": mutation})
+
+
+def pass_probability(copies, probs):
+    """
+    Return the probability that a parent with `copies` of the gene
+    passes it on to a child.
+    """
+    if copies == 2:
+        return 1 - probs["mutation"]
+    if copies == 1:
+        return 0.5
+    return probs["mutation"]
+
+
+def inheritance(probs):
+    """
+    Return a dictionary mapping (mother, father, child) gene counts to
+    the probability of the child's count given the parents'.
+    """
+    table = {}
+    for mother, father in itertools.product(GENES, repeat=2):
+        m = pass_probability(mother, probs)
+        f = pass_probability(father, probs)
+        table[mother, father, 0] = (1 - m) * (1 - f)
+        table[mother, father, 1] = m * (1 - f) + f * (1 - m)
+        table[mother, father, 2] = m * f
+    return table
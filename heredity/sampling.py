@@ -0,0 +1,367 @@
+import multiprocessing
+import warnings
+
+import numpy as np
+
+# Sweeps each Gibbs chain makes before its samples are counted
+BURN_IN = 100
+
+# Batches each chain's samples are split into to estimate standard errors
+BATCHES = 20
+
+# Effective sample size below which likelihood-weighted estimates are
+# dominated by a handful of samples and are not to be trusted
+MIN_EFFECTIVE_SAMPLES = 100
+
+
+class Lineage():
+    """
+    The people of a family as numbered columns, with arrays of the
+    columns of their parents (-1 for people without parents), the
+    generations to sample in order, and the known traits.
+    """
+
+    def __init__(self, people):
+        self.names = list(people)
+        column = {name: i for i, name in enumerate(self.names)}
+        self.mothers = np.array([
+            column.get(people[name]["mother"], -1) for name in self.names
+        ], dtype=np.int64)
+        self.fathers = np.array([
+            column.get(people[name]["father"], -1) for name in self.names
+        ], dtype=np.int64)
+        traits = [people[name]["trait"] for name in self.names]
+        self.observed = np.array([t is not None for t in traits])
+        self.traits = np.array([bool(t) for t in traits], dtype=np.int64)
+
+        # everyone comes one generation after the later of their parents,
+        # found without recursion so deep pedigrees are fine
+        depth = np.full(len(self.names), -1)
+        for i in range(len(self.names)):
+            stack = [i]
+            while stack:
+                j = stack[-1]
+                if self.mothers[j] < 0:
+                    depth[j] = 0
+                    stack.pop()
+                    continue
+                parents = [self.mothers[j], self.fathers[j]]
+                pending = [p for p in parents if depth[p] < 0]
+                if pending:
+                    stack.extend(pending)
+                else:
+                    depth[j] = 1 + depth[parents].max()
+                    stack.pop()
+        self.generations = [
+            np.flatnonzero(depth == level) for level in range(depth.max() + 1)
+        ]
+
+    def __len__(self):
+        return len(self.names)
+
+    def colours(self):
+        """
+        Return arrays of columns such that no two people in one array
+        share a factor, so each array can be resampled at once.
+        """
+        neighbours = [set() for _ in self.names]
+        for child in np.flatnonzero(self.mothers >= 0):
+            family = {child, self.mothers[child], self.fathers[child]}
+            for i in family:
+                neighbours[i].update(family - {i})
+        colour = []
+        for i in range(len(self.names)):
+            used = {colour[j] for j in neighbours[i] if j < i}
+            colour.append(next(c for c in range(len(used) + 1)
+                               if c not in used))
+        colour = np.array(colour)
+        return [np.flatnonzero(colour == c) for c in range(colour.max() + 1)]
+
+
+def sample_probabilities(people, model, method="gibbs", samples=10000,
+                         chains=1, seed=None, stats=None):
+    """
+    Return estimates of the gene and trait distribution of every person
+    in `people` under a Model, in the same form as heredity.main builds,
+    and their standard errors in the same form.
+
+    `method` is "likelihood" for likelihood-weighted sampling or "gibbs"
+    for Gibbs sampling of gene counts, given the known traits. The
+    `samples` are shared among `chains` independent chains, run in
+    worker processes when there is more than one.
+
+    Likelihood weighting draws gene counts from the prior, so once
+    several traits are known nearly all the weight can fall on a few
+    samples. Its standard errors come from the weights of the individual
+    samples, and its effective sample size (Kish's) is stored in `stats`
+    under "effective_samples" if it is a dict; below
+    MIN_EFFECTIVE_SAMPLES a RuntimeWarning is issued, as the estimates
+    and their errors are then unreliable. Use Gibbs sampling for large
+    pedigrees or many known traits. Its standard errors come from the
+    spread of estimates over batches of each chain's sweeps.
+    """
+    lineage = Lineage(people)
+    sampler = {"likelihood": likelihood_weighting, "gibbs": gibbs}[method]
+    seeds = np.random.SeedSequence(seed).spawn(chains)
+    jobs = [
+        (lineage, model, samples // chains + (k < samples % chains),
+         np.random.default_rng(seeds[k]))
+        for k in range(chains)
+    ]
+    if chains > 1:
+        with multiprocessing.Pool(chains) as pool:
+            results = pool.starmap(sampler, jobs)
+    else:
+        results = [sampler(*jobs[0])]
+
+    if method == "likelihood":
+        tally = results[0]
+        for other in results[1:]:
+            tally.merge(other)
+        estimate, error = tally.estimate(lineage)
+        effective = tally.effective_samples()
+        if stats is not None:
+            stats["effective_samples"] = effective
+        if effective < MIN_EFFECTIVE_SAMPLES:
+            warnings.warn(
+                f"likelihood weighting has an effective sample size of "
+                f"only {effective:.1f}, so its estimates and standard "
+                f"errors are unreliable; use Gibbs sampling instead",
+                RuntimeWarning, stacklevel=2
+            )
+        return distributions(lineage, estimate), distributions(lineage, error)
+
+    # the mean of the batch estimates, with their standard error
+    batches = np.concatenate(results)
+    estimate = batches.mean(axis=0)
+    spread = ((batches - estimate) ** 2).sum(axis=0)
+    error = np.sqrt(spread / (len(batches) * max(len(batches) - 1, 1)))
+    return distributions(lineage, estimate), distributions(lineage, error)
+
+
+class Tally():
+    """
+    Running sums over likelihood-weighted samples of each person's gene
+    count indicators (columns 0-2) and probability of the trait (column
+    3): the total weight and squared weight, and the sums of weight and
+    squared weight times each value and its square.
+
+    Sums are kept relative to the largest log weight seen, so that they
+    neither overflow nor underflow.
+    """
+
+    def __init__(self, people):
+        self.log_scale = -np.inf
+        self.weight = 0.0
+        self.square = 0.0
+        self.values = np.zeros((people, 4))
+        self.square_values = np.zeros((people, 4))
+        self.square_squares = np.zeros((people, 4))
+
+    def rescale(self, log_scale):
+        if log_scale <= self.log_scale:
+            return
+        factor = np.exp(self.log_scale - log_scale)
+        self.weight *= factor
+        self.square *= factor ** 2
+        self.values *= factor
+        self.square_values *= factor ** 2
+        self.square_squares *= factor ** 2
+        self.log_scale = log_scale
+
+    def add(self, log_weights, genes, trait):
+        """
+        Add samples with the given log weights, gene counts (a samples x
+        N array) and probabilities of the trait given those counts.
+        """
+        if log_weights.max() == -np.inf:
+            return
+        self.rescale(log_weights.max())
+        weights = np.exp(log_weights - self.log_scale)
+        squares = weights ** 2
+        self.weight += weights.sum()
+        self.square += squares.sum()
+        for g in range(3):
+            present = genes == g
+            self.values[:, g] += weights @ present
+            self.square_values[:, g] += squares @ present
+            self.square_squares[:, g] += squares @ present
+        self.values[:, 3] += weights @ trait
+        self.square_values[:, 3] += squares @ trait
+        self.square_squares[:, 3] += squares @ trait ** 2
+
+    def merge(self, other):
+        """Add the samples of another Tally."""
+        if other.weight == 0:
+            return
+        self.rescale(other.log_scale)
+        factor = np.exp(other.log_scale - self.log_scale)
+        self.weight += factor * other.weight
+        self.square += factor ** 2 * other.square
+        self.values += factor * other.values
+        self.square_values += factor ** 2 * other.square_values
+        self.square_squares += factor ** 2 * other.square_squares
+
+    def effective_samples(self):
+        """
+        Return Kish's effective sample size, (sum of weights)^2 / sum of
+        squared weights.
+        """
+        if self.weight == 0:
+            return 0.0
+        return self.weight ** 2 / self.square
+
+    def estimate(self, lineage):
+        """
+        Return N x 5 arrays of the self-normalized estimates, as in
+        `distributions`, and of their delta-method standard errors,
+        sqrt(sum w^2 (x - estimate)^2) / sum w. Known traits are exact.
+        """
+        if self.weight == 0:
+            raise ValueError("no sample agrees with the known traits")
+        mean = self.values / self.weight
+        spread = (self.square_squares - 2 * mean * self.square_values
+                  + mean ** 2 * self.square)
+        error = np.sqrt(np.maximum(spread, 0)) / self.weight
+
+        observed = lineage.observed
+        mean[observed, 3] = lineage.traits[observed]
+        error[observed, 3] = 0
+        estimate = np.column_stack([mean[:, :3], 1 - mean[:, 3], mean[:, 3]])
+        error = np.column_stack([error[:, :3], error[:, 3], error[:, 3]])
+        return estimate, error
+
+
+def distributions(lineage, values):
+    """
+    Return an N x 5 array of values for gene counts 0, 1, 2 and for
+    not having and having the trait as the nested dictionaries of
+    heredity.main.
+    """
+    return {
+        name: {
+            "gene": {g: float(values[i, g]) for g in (2, 1, 0)},
+            "trait": {True: float(values[i, 4]), False: float(values[i, 3])},
+        }
+        for i, name in enumerate(lineage.names)
+    }
+
+
+def batch_sizes(samples):
+    """
+    Return the sizes of the batches `samples` are split into.
+    """
+    batches = max(1, min(BATCHES, samples))
+    return [samples // batches + (k < samples % batches)
+            for k in range(batches)]
+
+
+def draw(distribution, rng):
+    """
+    Return one draw from each distribution over gene counts in the last
+    axis of `distribution`, by inverting its cumulative sum.
+    """
+    threshold = rng.random(distribution.shape[:-1])[..., None]
+    cumulative = distribution.cumsum(axis=-1)[..., :-1]
+    return (threshold >= cumulative).sum(axis=-1)
+
+
+def forward(lineage, model, samples, rng):
+    """
+    Return a samples x N array of gene counts drawn from the pedigree's
+    prior, a generation at a time.
+    """
+    genes = np.empty((samples, len(lineage)), dtype=np.int64)
+    for level, people in enumerate(lineage.generations):
+        if level == 0:
+            genes[:, people] = draw(
+                np.broadcast_to(model.gene, (samples, len(people), 3)), rng
+            )
+        else:
+            genes[:, people] = draw(model.inherit[
+                genes[:, lineage.mothers[people]],
+                genes[:, lineage.fathers[people]],
+            ], rng)
+    return genes
+
+
+def likelihood_weighting(lineage, model, samples, rng):
+    """
+    Return a Tally of `samples` gene counts drawn from the prior and
+    weighted by the likelihood of the known traits, drawn in batches
+    to bound memory.
+
+    Trait estimates use each sample's probability of the trait given
+    its gene counts rather than a drawn trait.
+    """
+    observed = np.flatnonzero(lineage.observed)
+    tally = Tally(len(lineage))
+    for size in batch_sizes(samples):
+        genes = forward(lineage, model, size, rng)
+        with np.errstate(divide="ignore"):
+            log_weights = np.log(
+                model.trait[genes[:, observed], lineage.traits[observed]]
+            ).sum(axis=1)
+        tally.add(log_weights, genes, model.trait[genes, 1])
+    return tally
+
+
+def gibbs(lineage, model, samples, rng):
+    """
+    Return one row of estimates per batch of `samples` Gibbs sweeps,
+    after BURN_IN sweeps that are not counted.
+
+    A sweep resamples each colour of people at once from their gene
+    count's distribution given everyone else's and the known traits.
+    Estimates average those distributions rather than the drawn counts.
+    """
+    founders = lineage.mothers < 0
+    with np.errstate(divide="ignore"):
+        log_gene = np.log(model.gene)
+        log_inherit = np.log(model.inherit)
+        evidence = np.where(
+            lineage.observed[:, None],
+            np.log(model.trait[:, lineage.traits].T), 0
+        )
+    # log_inherit by mother's count given father's and child's, and
+    # by father's count given mother's and child's
+    as_mother = log_inherit.transpose(1, 2, 0)
+    as_father = log_inherit.transpose(0, 2, 1)
+
+    # for each colour, the links from its people to their children
+    plan = []
+    children = np.flatnonzero(~founders)
+    for people in lineage.colours():
+        position = np.full(len(lineage), -1)
+        position[people] = np.arange(len(people))
+        mothers = children[position[lineage.mothers[children]] >= 0]
+        fathers = children[position[lineage.fathers[children]] >= 0]
+        plan.append((people, position, mothers, fathers))
+
+    genes = forward(lineage, model, 1, rng)[0]
+    rows = []
+    for sweeps in [BURN_IN] + batch_sizes(samples):
+        totals = np.zeros((len(lineage), 3))
+        for _ in range(sweeps):
+            for people, position, mothers, fathers in plan:
+                log_p = evidence[people] + np.where(
+                    founders[people, None], log_gene,
+                    log_inherit[genes[lineage.mothers[people]],
+                                genes[lineage.fathers[people]]]
+                )
+                np.add.at(log_p, position[lineage.mothers[mothers]],
+                          as_mother[genes[lineage.fathers[mothers]],
+                                    genes[mothers]])
+                np.add.at(log_p, position[lineage.fathers[fathers]],
+                          as_father[genes[lineage.mothers[fathers]],
+                                    genes[fathers]])
+                p = np.exp(log_p - log_p.max(axis=1, keepdims=True))
+                p /= p.sum(axis=1, keepdims=True)
+                genes[people] = draw(p, rng)
+                totals[people] += p
+        gene = totals / sweeps
+        trait = gene @ model.trait[:, 1]
+        trait[lineage.observed] = lineage.traits[lineage.observed]
+        rows.append(np.column_stack([gene, 1 - trait, trait]))
+    # the first row is the burn-in
+    return np.array(rows[1:])
@@ -0,0 +1,134 @@
+import numpy as np
+
+# Assignments evaluated per batch of array operations
+CHUNK = 65536
+
+
+class Pedigree():
+    """
+    The people of a family as numbered columns, each with a factor: a
+    flat table of probabilities and the gene and trait columns (its
+    scope) whose values, times their strides, index into it.
+
+    A person without parents has a factor over their own gene count and
+    trait, and a child one over their mother's, father's and own gene
+    counts and their own trait.
+    """
+
+    def __init__(self, people, model):
+        self.names = list(people)
+        column = {name: i for i, name in enumerate(self.names)}
+        traits = [people[name]["trait"] for name in self.names]
+        self.observed = np.array([t is not None for t in traits])
+        self.traits = np.array([bool(t) for t in traits])
+
+        self.factors = []
+        for i, name in enumerate(self.names):
+            data = people[name]
+            if data["mother"] is None and data["father"] is None:
+                table = model.gene[:, None] * model.trait
+                scope = [("gene", i), ("trait", i)]
+            else:
+                table = model.inherit[..., None] * model.trait
+                scope = [("gene", column[data["mother"]]),
+                         ("gene", column[data["father"]]),
+                         ("gene", i), ("trait", i)]
+            strides = np.array(table.strides) // table.itemsize
+            self.factors.append((table.ravel(), scope, strides))
+
+    def __len__(self):
+        return len(self.names)
+
+
+def joint_probabilities(pedigree, genes, traits):
+    """
+    Return the joint probability of each of A assignments, given as
+    A x N arrays of gene counts and of traits (as booleans) for the N
+    people of a Pedigree.
+    """
+    columns = {"gene": genes, "trait": traits.astype(np.int64)}
+    p = np.ones(len(genes))
+    for table, scope, strides in pedigree.factors:
+        index = sum(
+            stride * columns[kind][:, i]
+            for (kind, i), stride in zip(scope, strides)
+        )
+        p *= table[index]
+    return p
+
+
+def enumerate_probabilities(people, model, chunk=CHUNK):
+    """
+    Return the gene and trait distribution of every person in `people`
+    under a Model by brute-force enumeration, as
+    heredity.enumerate_probabilities does,
+    evaluating about `chunk` assignments at a time with array operations.
+
+    Only assignments agreeing with the known traits are generated. Each
+    chunk is a grid over the gene counts of the first few people and the
+    unknown traits, laid out once; chunks differ only in the gene counts
+    of the rest, which are the same across a chunk. So factors of the
+    first few people alone are evaluated once, and the rest are looked
+    up per chunk from their part of the index computed up front. The
+    grid axes' totals are summed out once at the end.
+    """
+    pedigree = Pedigree(people, model)
+    n = len(pedigree)
+    unknown = list(np.flatnonzero(~pedigree.observed))
+    low = 0
+    while low < n and 2 ** len(unknown) * 3 ** (low + 1) <= chunk:
+        low += 1
+    grid = (3,) * low + (2,) * len(unknown)
+    axes = np.indices(grid).reshape(len(grid), -1)
+
+    fixed = np.ones(axes.shape[1])
+    varying = []
+    for table, scope, strides in pedigree.factors:
+        index = np.zeros(axes.shape[1], dtype=np.int64)
+        high = []
+        for (kind, i), stride in zip(scope, strides):
+            if kind == "gene" and i >= low:
+                high.append((i - low, stride))
+            elif kind == "gene":
+                index += stride * axes[i]
+            elif i in unknown:
+                index += stride * axes[low + unknown.index(i)]
+            else:
+                index += stride * int(pedigree.traits[i])
+        if high:
+            varying.append((table, index, high))
+        else:
+            fixed *= table[index]
+
+    totals = np.zeros(axes.shape[1])
+    high_totals = np.zeros((n - low, 3))
+    for high in range(3 ** (n - low)):
+        digits = high // 3 ** np.arange(n - low) % 3
+        p = fixed.copy()
+        for table, index, parts in varying:
+            p *= table[index + sum(stride * digits[i] for i, stride in parts)]
+        totals += p
+        high_totals[np.arange(n - low), digits] += p.sum()
+
+    totals = totals.reshape(grid)
+    marginals = [
+        totals.sum(axis=tuple(b for b in range(len(grid)) if b != a))
+        for a in range(len(grid))
+    ]
+    gene_totals = np.concatenate([np.array(marginals[:low]).reshape(low, 3),
+                                  high_totals])
+    gene_totals /= gene_totals.sum(axis=1, keepdims=True)
+    trait_totals = np.zeros((n, 2))
+    trait_totals[np.arange(n), pedigree.traits.astype(np.int64)] = 1
+    for a, i in enumerate(unknown):
+        trait_totals[i] = marginals[low + a] / marginals[low + a].sum()
+    return {
+        name: {
+            "gene": {g: float(gene_totals[i, g]) for g in (2, 1, 0)},
+            "trait": {
+                True: float(trait_totals[i, 1]),
+                False: float(trait_totals[i, 0]),
+            },
+        }
+        for i, name in enumerate(pedigree.names)
+    }
@@ -1,7 +1,45 @@
+import functools
 import itertools
+import weakref
+
+# Interned sentences by their class and parts, dropped once unused
+INTERNED = weakref.WeakValueDictionary()
+
+
+def cached(method):
+    """
+    Caches what a method returns on interned sentences, which never
+    change, in the slot named after the method.
+    """
+    slot = "_" + method.__name__.strip("_")
+
+    @functools.wraps(method)
+    def wrapper(self):
+        value = getattr(self, slot)
+        if value is None:
+            value = method(self)
+            if self.interned:
+                setattr(self, slot, value)
+        # callers may change the set of symbols they are given
+        return set(value) if isinstance(value, set) else value
+    return wrapper
 
 
 class Sentence():
+    __slots__ = ("interned", "_hash", "_symbols", "_formula", "__weakref__")
+
+    def __new__(cls, *args, **kwargs):
+        sentence = super().__new__(cls)
+        sentence.interned = False
+        sentence._hash = sentence._symbols = sentence._formula = None
+        return sentence
+
+    def __reduce__(self):
+        # interned sentences are interned again when unpickled, so equal
+        # ones are still the same object
+        if self.interned:
+            return reinterned, (type(self), parts(self))
+        return type(self), parts(self)
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -43,6 +81,7 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
     def __init__(self, name):
         self.name = name
@@ -70,6 +109,8 @@ class Symbol(Sentence):
 
 
 class Not(Sentence):
+    __slots__ = ("operand",)
+
     def __init__(self, operand):
         Sentence.validate(operand)
         self.operand = operand
@@ -77,6 +118,7 @@ class Not(Sentence):
     def __eq__(self, other):
         return isinstance(other, Not) and self.operand == other.operand
 
+    @cached
     def __hash__(self):
         return hash(("not", hash(self.operand)))
 
@@ -86,14 +128,18 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    @cached
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
+    @cached
     def symbols(self):
         return self.operand.symbols()
 
 
 class And(Sentence):
+    __slots__ = ("conjuncts",)
+
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
@@ -102,6 +148,7 @@ class And(Sentence):
     def __eq__(self, other):
         return isinstance(other, And) and self.conjuncts == other.conjuncts
 
+    @cached
     def __hash__(self):
         return hash(
             ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
@@ -115,22 +162,28 @@ class And(Sentence):
 
     def add(self, conjunct):
         Sentence.validate(conjunct)
+        if self.interned:
+            raise TypeError("interned sentences cannot be changed")
         self.conjuncts.append(conjunct)
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    @cached
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
+    @cached
     def symbols(self):
         return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
 
 
 class Or(Sentence):
+    __slots__ = ("disjuncts",)
+
     def __init__(self, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
@@ -139,6 +192,7 @@ class Or(Sentence):
     def __eq__(self, other):
         return isinstance(other, Or) and self.disjuncts == other.disjuncts
 
+    @cached
     def __hash__(self):
         return hash(
             ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
@@ -151,17 +205,21 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    @cached
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
+    @cached
     def symbols(self):
         return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
 
 
 class Implication(Sentence):
+    __slots__ = ("antecedent", "consequent")
+
     def __init__(self, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
@@ -173,6 +231,7 @@ class Implication(Sentence):
                 and self.antecedent == other.antecedent
                 and self.consequent == other.consequent)
 
+    @cached
     def __hash__(self):
         return hash(("implies", hash(self.antecedent), hash(self.consequent)))
 
@@ -183,16 +242,20 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    @cached
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
+    @cached
     def symbols(self):
         return set.union(self.antecedent.symbols(), self.consequent.symbols())
 
 
 class Biconditional(Sentence):
+    __slots__ = ("left", "right")
+
     def __init__(self, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
@@ -204,6 +267,7 @@ class Biconditional(Sentence):
                 and self.left == other.left
                 and self.right == other.right)
 
+    @cached
     def __hash__(self):
         return hash(("biconditional", hash(self.left), hash(self.right)))
 
@@ -216,48 +280,177 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    @cached
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
+    @cached
     def symbols(self):
         return set.union(self.left.symbols(), self.right.symbols())
 
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
-
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
+def intern(sentence):
+    """
+    Returns the interned sentence equal to sentence. Interned sentences
+    are shared: structurally equal ones are the same object, so a
+    knowledge base is a DAG rather than a tree, and they cache their
+    hash, symbols and formula, as they cannot be changed.
+    """
+    Sentence.validate(sentence)
+    if sentence.interned:
+        return sentence
+    if isinstance(sentence, Symbol):
+        arguments = parts(sentence)
+        key = (Symbol,) + arguments
+    else:
+        arguments = tuple(intern(part) for part in parts(sentence))
+        # interned parts are alive while a sentence made of them is, so
+        # their ids stand for them
+        key = (type(sentence),) + tuple(id(part) for part in arguments)
+    node = INTERNED.get(key)
+    if node is None:
+        node = type(sentence)(*arguments)
+        node.interned = True
+        INTERNED[key] = node
+    return node
+
+
+def parts(sentence):
+    """Returns the arguments that construct a sentence equal to sentence."""
+    if isinstance(sentence, Symbol):
+        return (sentence.name,)
+    if isinstance(sentence, Not):
+        return (sentence.operand,)
+    if isinstance(sentence, And):
+        return tuple(sentence.conjuncts)
+    if isinstance(sentence, Or):
+        return tuple(sentence.disjuncts)
+    if isinstance(sentence, Implication):
+        return (sentence.antecedent, sentence.consequent)
+    if isinstance(sentence, Biconditional):
+        return (sentence.left, sentence.right)
+    raise TypeError("must be a logical sentence")
+
+
+def reinterned(cls, arguments):
+    """Returns the interned sentence built from arguments, for unpickling."""
+    return intern(cls(*arguments))
+
+
+class Program():
+    """
+    Sentences compiled to a flat list of instructions over truth-table
+    columns: Python integers whose bit i is a sentence's value in model i,
+    so each instruction evaluates every model in a block at once with one
+    bitwise operation. Structurally equal subsentences are compiled once.
+
+    Each instruction is an opcode and the indices of the instructions
+    (or, for "symbol", the symbol column) it reads.
+    """
+
+    def __init__(self, sentences, symbols):
+        self.symbols = list(symbols)
+        self.instructions = []
+        self.compiled = {}
+        column = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.outputs = [self.emit(intern(s), column) for s in sentences]
+
+    def emit(self, sentence, column):
+        """Returns the instruction computing sentence, adding it if new."""
+        if sentence in self.compiled:
+            return self.compiled[sentence]
+        if isinstance(sentence, Symbol):
+            instruction = ("symbol", column[sentence.name])
+        elif isinstance(sentence, Not):
+            instruction = ("not", self.emit(sentence.operand, column))
+        elif isinstance(sentence, And):
+            instruction = ("and",) + tuple(
+                self.emit(c, column) for c in sentence.conjuncts
+            )
+        elif isinstance(sentence, Or):
+            instruction = ("or",) + tuple(
+                self.emit(d, column) for d in sentence.disjuncts
+            )
+        elif isinstance(sentence, Implication):
+            instruction = ("implies", self.emit(sentence.antecedent, column),
+                           self.emit(sentence.consequent, column))
+        elif isinstance(sentence, Biconditional):
+            instruction = ("iff", self.emit(sentence.left, column),
+                           self.emit(sentence.right, column))
         else:
+            raise TypeError("must be a logical sentence")
+        self.instructions.append(instruction)
+        self.compiled[sentence] = len(self.instructions) - 1
+        return self.compiled[sentence]
+
+    def run(self, columns, ones):
+        """
+        Returns the truth-table columns of the compiled sentences, given
+        a column for each symbol and `ones`, the column true in every
+        model of the block.
+        """
+        values = []
+        for opcode, *operands in self.instructions:
+            if opcode == "symbol":
+                value = columns[operands[0]]
+            elif opcode == "not":
+                value = values[operands[0]] ^ ones
+            elif opcode == "and":
+                value = ones
+                for operand in operands:
+                    value &= values[operand]
+            elif opcode == "or":
+                value = 0
+                for operand in operands:
+                    value |= values[operand]
+            elif opcode == "implies":
+                value = (values[operands[0]] ^ ones) | values[operands[1]]
+            else:
+                value = (values[operands[0]] ^ values[operands[1]]) ^ ones
+            values.append(value)
+        return [values[output] for output in self.outputs]
+
+
+# Symbols whose models are laid out across the bits of one block
+BLOCK_SYMBOLS = 16
+
+
+def truth_columns(symbols):
+    """
+    Returns the columns of the first `symbols` symbols over a block of
+    2 ** symbols models, where symbol i is true in model m if bit i of
+    m is set, and the column true in every model.
+    """
+    models = 1 << symbols
+    ones = (1 << models) - 1
+    columns = []
+    for i in range(symbols):
+        # 2^i false models then 2^i true ones, repeated
+        period = ((1 << (1 << i)) - 1) << (1 << i)
+        repeats = ones // ((1 << (2 << i)) - 1)
+        columns.append(period * repeats)
+    return columns, ones
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
 
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+def model_check(knowledge, query):
+    """Checks if knowledge base entails query."""
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
-
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    program = Program([knowledge, query], symbols)
+
+    # Models of the first symbols fill a block of bits; the rest are
+    # the same across a block, so each block is one run of the program
+    inner = min(len(symbols), BLOCK_SYMBOLS)
+    columns, ones = truth_columns(inner)
+    for block in range(1 << (len(symbols) - inner)):
+        outer = [ones if block >> i & 1 else 0
+                 for i in range(len(symbols) - inner)]
+        knowledge_true, query_true = program.run(columns + outer, ones)
+
+        # Knowledge base must not be true in any model where query is false
+        if knowledge_true & ~query_true & ones:
+            return False
+    return True
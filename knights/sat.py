@@ -0,0 +1,317 @@
+import heapq
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol, intern
+
+# Scale applied to the activity bump after every conflict
+DECAY = 0.95
+
+
+def entails(knowledge, query):
+    """
+    Checks if knowledge base entails query, like model_check, by showing
+    that knowledge and the negation of query cannot both be true.
+    """
+    cnf = CNF()
+    cnf.require(intern(knowledge))
+    cnf.forbid(intern(query))
+    return not Solver(cnf.variables, cnf.clauses).solve()
+
+
+def satisfiable(*sentences):
+    """
+    Returns a model (a dict from symbol names to truth values) in which
+    all sentences are true, or None if there is none.
+    """
+    cnf = CNF()
+    for sentence in sentences:
+        cnf.require(intern(sentence))
+    solver = Solver(cnf.variables, cnf.clauses)
+    if not solver.solve():
+        return None
+    return {
+        name: solver.values[variable]
+        for name, variable in cnf.symbols.items()
+    }
+
+
+class CNF():
+    """
+    Clauses equisatisfiable with a set of sentences, by the Tseitin
+    encoding: every compound subsentence gets a variable of its own,
+    with clauses making it equal to its operator applied to the
+    literals of its operands. Literals are non-zero integers, negative
+    for a negated variable.
+    """
+
+    def __init__(self):
+        self.variables = 0
+        self.clauses = []
+        self.symbols = {}
+        self.literals = {}
+
+    def variable(self):
+        self.variables += 1
+        return self.variables
+
+    def require(self, sentence):
+        """Adds clauses that hold only if sentence is true."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.require(conjunct)
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+    def forbid(self, sentence):
+        """Adds clauses that hold only if sentence is false."""
+        if isinstance(sentence, Or):
+            for disjunct in sentence.disjuncts:
+                self.forbid(disjunct)
+        else:
+            self.clauses.append([-self.literal(sentence)])
+
+    def literal(self, sentence):
+        """Returns the literal equal to sentence, adding its clauses."""
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.symbols:
+                self.symbols[sentence.name] = self.variable()
+            return self.symbols[sentence.name]
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if sentence in self.literals:
+            return self.literals[sentence]
+
+        if isinstance(sentence, And):
+            operands = [self.literal(c) for c in sentence.conjuncts]
+            x = self.variable()
+            self.clauses.extend([-x, c] for c in operands)
+            self.clauses.append([x] + [-c for c in operands])
+        elif isinstance(sentence, Or):
+            operands = [self.literal(d) for d in sentence.disjuncts]
+            x = self.variable()
+            self.clauses.extend([x, -d] for d in operands)
+            self.clauses.append([-x] + operands)
+        elif isinstance(sentence, Implication):
+            a = self.literal(sentence.antecedent)
+            b = self.literal(sentence.consequent)
+            x = self.variable()
+            self.clauses.extend([[-x, -a, b], [x, a], [x, -b]])
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            x = self.variable()
+            self.clauses.extend([[-x, -a, b], [-x, a, -b],
+                                 [x, a, b], [x, -a, -b]])
+        else:
+            raise TypeError("must be a logical sentence")
+        self.literals[sentence] = x
+        return x
+
+
+class Solver():
+    """
+    A CDCL satisfiability solver over clauses of integer literals.
+
+    Each clause of two or more literals watches its first two, and is
+    only looked at when one of them becomes false: then it either finds
+    another literal to watch, implies its other watched literal (unit
+    propagation), or is in conflict. A conflict is analysed back to its
+    first unique implication point, the clause learnt from it is added,
+    and the search jumps back to the level where that clause implies
+    something. Decisions pick the most active unassigned variable,
+    trying the value it last had.
+    """
+
+    def __init__(self, variables, clauses):
+        self.variables = variables
+        self.clauses = []
+        self.watches = {}
+        for v in range(1, variables + 1):
+            self.watches[v] = []
+            self.watches[-v] = []
+        self.values = [None] * (variables + 1)
+        self.levels = [0] * (variables + 1)
+        self.reasons = [None] * (variables + 1)
+        self.phases = [False] * (variables + 1)
+        self.activity = [0.0] * (variables + 1)
+        self.bump = 1.0
+        self.heap = [(0.0, v) for v in range(1, variables + 1)]
+        self.trail = []
+        self.limits = []
+        self.head = 0
+        self.consistent = True
+
+        for clause in clauses:
+            clause = list(dict.fromkeys(clause))
+            if any(-literal in clause for literal in clause):
+                continue
+            if not clause:
+                self.consistent = False
+            elif len(clause) == 1:
+                value = self.value(clause[0])
+                if value is False:
+                    self.consistent = False
+                elif value is None:
+                    self.assign(clause[0], None)
+            else:
+                self.attach(clause)
+
+    def value(self, literal):
+        value = self.values[abs(literal)]
+        if value is None or literal > 0:
+            return value
+        return not value
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.values[variable] = literal > 0
+        self.levels[variable] = len(self.limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def attach(self, clause):
+        self.clauses.append(clause)
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+        return clause
+
+    def propagate(self):
+        """
+        Assigns every literal implied by unit propagation, returning
+        a clause in conflict or None.
+        """
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            watching = self.watches[false]
+            kept = []
+            for i, clause in enumerate(watching):
+                # keep the falsified literal second
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.value(clause[0]) is True:
+                    kept.append(clause)
+                    continue
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches[clause[1]].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if self.value(clause[0]) is False:
+                        kept.extend(watching[i + 1:])
+                        self.watches[false] = kept
+                        return clause
+                    self.assign(clause[0], clause)
+            self.watches[false] = kept
+        return None
+
+    def analyse(self, conflict):
+        """
+        Returns the clause learnt from a conflict, asserting literal
+        first and the literal of the next highest level second, and the
+        level to jump back to.
+        """
+        level = len(self.limits)
+        seen = set()
+        learnt = [None]
+        pending = 0
+        index = len(self.trail) - 1
+        clause = conflict
+        literal = None
+        while True:
+            for other in clause:
+                variable = abs(other)
+                if other == literal or variable in seen:
+                    continue
+                if self.levels[variable] == 0:
+                    continue
+                seen.add(variable)
+                self.activate(variable)
+                if self.levels[variable] == level:
+                    pending += 1
+                else:
+                    learnt.append(other)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reasons[abs(literal)]
+        learnt[0] = -literal
+
+        if len(learnt) == 1:
+            return learnt, 0
+        second = max(range(1, len(learnt)),
+                     key=lambda i: self.levels[abs(learnt[i])])
+        learnt[1], learnt[second] = learnt[second], learnt[1]
+        return learnt, self.levels[abs(learnt[1])]
+
+    def activate(self, variable):
+        self.activity[variable] += self.bump
+        if self.activity[variable] > 1e100:
+            # scale everything down before the floats overflow
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.bump *= 1e-100
+            self.heap = [(-self.activity[v], v)
+                         for v in range(1, self.variables + 1)]
+            heapq.heapify(self.heap)
+        heapq.heappush(self.heap, (-self.activity[variable], variable))
+
+    def backtrack(self, level):
+        while len(self.limits) > level:
+            start = self.limits.pop()
+            for literal in self.trail[start:]:
+                variable = abs(literal)
+                self.phases[variable] = literal > 0
+                self.values[variable] = None
+                self.reasons[variable] = None
+                heapq.heappush(self.heap,
+                               (-self.activity[variable], variable))
+            del self.trail[start:]
+        self.head = len(self.trail)
+
+    def decide(self):
+        """
+        Returns the most active unassigned variable, or None if every
+        variable is assigned.
+        """
+        while self.heap:
+            activity, variable = heapq.heappop(self.heap)
+            if (self.values[variable] is None
+                    and -activity == self.activity[variable]):
+                return variable
+        for variable in range(1, self.variables + 1):
+            if self.values[variable] is None:
+                return variable
+        return None
+
+    def solve(self):
+        """
+        Returns True, leaving a satisfying assignment in `values`, if the
+        clauses can all be satisfied, otherwise False.
+        """
+        if not self.consistent:
+            return False
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if not self.limits:
+                    return False
+                learnt, level = self.analyse(conflict)
+                self.backtrack(level)
+                if len(learnt) == 1:
+                    self.assign(learnt[0], None)
+                else:
+                    self.assign(learnt[0], self.attach(learnt))
+                self.bump /= DECAY
+                continue
+
+            variable = self.decide()
+            if variable is None:
+                return True
+            self.limits.append(len(self.trail))
+            self.assign(variable if self.phases[variable] else -variable,
+                        None)
@@ -0,0 +1,164 @@
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+from graph import LinkGraph
+from pagerank import DAMPING, random_walk
+from solvers import gauss_seidel, power_iteration
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare PageRank engines on synthetic power-law corpora."
+    )
+    parser.add_argument("--pages", type=int, nargs="+", default=[10000, 100000],
+                        help="corpus sizes to generate")
+    parser.add_argument("--links", type=float, default=8,
+                        help="mean links per page")
+    parser.add_argument("--exponent", type=float, default=2.1,
+                        help="power-law exponent of link counts and popularity")
+    parser.add_argument("--samples", type=int, default=None,
+                        help="samples for the sampling engine "
+                             "(default: 100 per page)")
+    parser.add_argument("--processes", type=int, default=4,
+                        help="worker processes for the parallel "
+                             "gauss-seidel run")
+    parser.add_argument("--extrapolate", type=int, default=10,
+                        metavar="SWEEPS",
+                        help="sweeps between Aitken jumps for the "
+                             "extrapolated gauss-seidel run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="pagerank-benchmark.json",
+                        help="file to write the JSON report to")
+    args = parser.parse_args()
+
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "damping": DAMPING,
+        "runs": [],
+    }
+    for pages in args.pages:
+        graph = synthetic_graph(pages, args.links, args.exponent, args.seed)
+        samples = args.samples or 100 * pages
+        print(f"{pages} pages, {len(graph.indices)} links")
+
+        stats = {}
+        ranks, seconds, memory = measure(
+            power_iteration, graph, DAMPING, stats=stats
+        )
+        report["runs"].append({
+            "engine": "iterate",
+            "pages": pages,
+            "links": len(graph.indices),
+            "seconds": seconds,
+            "peak_memory": memory,
+            "iterations": stats["iterations"],
+            "residuals": stats["residuals"],
+        })
+        print(f"  iterate: {stats['iterations']} sweeps, {seconds:.3f}s, "
+              f"{memory / 2 ** 20:.1f} MiB")
+
+        # serial, parallel, and serial with extrapolation
+        for processes, extrapolate in [(1, 0), (args.processes, 0),
+                                       (1, args.extrapolate)]:
+            stats = {}
+            solved, seconds, memory = measure(
+                gauss_seidel, graph, DAMPING, stats=stats,
+                processes=processes, extrapolate=extrapolate
+            )
+            error = float(np.abs(solved - ranks).sum())
+            report["runs"].append({
+                "engine": "gauss-seidel",
+                "pages": pages,
+                "links": len(graph.indices),
+                "processes": processes,
+                "extrapolate": extrapolate,
+                "seconds": seconds,
+                "peak_memory": memory,
+                "iterations": stats["iterations"],
+                "residuals": stats["residuals"],
+                "error": error,
+            })
+            print(f"  gauss-seidel (processes={processes}, extrapolate="
+                  f"{extrapolate}): {stats['iterations']} sweeps, "
+                  f"{seconds:.3f}s, {memory / 2 ** 20:.1f} MiB, "
+                  f"L1 error {error:.2e}")
+
+        sampled, seconds, memory = measure(
+            random_walk, graph, DAMPING, samples, seed=args.seed
+        )
+        error = float(np.abs(sampled - ranks).sum())
+        report["runs"].append({
+            "engine": "sample",
+            "pages": pages,
+            "links": len(graph.indices),
+            "seconds": seconds,
+            "peak_memory": memory,
+            "samples": samples,
+            "error": error,
+        })
+        print(f"  sample: {samples} samples, {seconds:.3f}s, "
+              f"{memory / 2 ** 20:.1f} MiB, L1 error {error:.4f}")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+
+def synthetic_graph(pages, links, exponent, seed=0):
+    """
+    Return a random LinkGraph whose link counts and page popularity
+    both follow power laws with the given exponent, drawing about
+    `links` links per page before repeats and self-links are dropped.
+    """
+    rng = np.random.default_rng(seed)
+
+    # heavy-tailed link counts, rescaled to the requested mean
+    degree = rng.pareto(exponent - 1, pages) + 1
+    degree = np.minimum(np.floor(degree * links / degree.mean()), pages - 1)
+    degree = degree.astype(np.int64)
+
+    # link to pages with probability falling off with popularity rank
+    popularity = np.arange(1, pages + 1) ** -(1 / (exponent - 1))
+    cumulative = np.cumsum(popularity / popularity.sum())
+    targets = np.searchsorted(cumulative, rng.random(degree.sum()))
+    targets = rng.permutation(pages)[np.minimum(targets, pages - 1)]
+
+    # drop self-links and repeats, as crawl() would
+    sources = np.repeat(np.arange(pages), degree)
+    pairs = np.unique(np.stack([sources, targets], axis=1), axis=0)
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+    counts = np.bincount(pairs[:, 0], minlength=pages)
+    indptr = np.concatenate([[0], np.cumsum(counts)])
+    names = [f"{page}.html" for page in range(pages)]
+    return LinkGraph(names, indptr, pairs[:, 1].astype(np.int32))
+
+
+def measure(engine, *args, **kwargs):
+    """
+    Run an engine twice, returning its result, the wall time in seconds
+    of the first run and the peak traced memory in bytes of the second.
+
+    Tracing slows engines down by very different amounts, so the timed
+    run is not traced.
+    """
+    start = time.perf_counter()
+    result = engine(*args, **kwargs)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        engine(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import functools
+import multiprocessing
+import os
+import re
+import sys
+
+# Characters of HTML read from a page at a time
+CHUNK_SIZE = 256 * 1024
+
+# Longest unfinished tag carried from one chunk to the next
+MAX_TAG = 64 * 1024
+
+# Links are the href of <a> tags
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Pages handed to a worker process at a time
+PAGES_PER_TASK = 64
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python crawler.py corpus [processes]")
+    processes = int(sys.argv[2]) if len(sys.argv) == 3 else None
+    for page, link in crawl_edges(sys.argv[1], processes):
+        print(f"{page}\t{link}")
+
+
+def page_links(directory, filename):
+    """
+    Return the filename and the set of links in one HTML page,
+    reading it a chunk at a time rather than all at once.
+    """
+    links = set()
+    pending = ""
+    with open(os.path.join(directory, filename)) as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            text = pending + chunk
+            end = 0
+            for match in LINK.finditer(text):
+                links.add(match.group(1))
+                end = match.end()
+
+            # carry a tag left open at the end of the chunk over to the
+            # next one, unless it is too long to be a real tag
+            start = text.find("<", max(text.rfind(">") + 1, end))
+            if start == -1 or len(text) - start > MAX_TAG:
+                pending = ""
+            else:
+                pending = text[start:]
+    return filename, links
+
+
+def corpus_pages(directory):
+    """
+    Return the sorted filenames of the HTML pages in a directory.
+    """
+    return sorted(
+        filename for filename in os.listdir(directory)
+        if filename.endswith(".html")
+    )
+
+
+def crawl_edges(directory, processes=None, pages=None):
+    """
+    Yield a (page, link) pair for every link from one page of the corpus
+    to another, as soon as the page it comes from has been scanned.
+
+    `pages` defaults to every page in `directory`.
+    """
+    if pages is None:
+        pages = corpus_pages(directory)
+    corpus = set(pages)
+    for page, links in scan_pages(directory, pages, processes):
+        yield from corpus_links(page, links, corpus)
+
+
+def scan_pages(directory, pages, processes=None):
+    """
+    Yield (page, links) for each of `pages` in `directory` in the order
+    they finish, with every link found whether or not it is in the corpus.
+
+    Pages are scanned by a pool of `processes` worker processes (one per
+    core by default, none if 1), so only the links of pages in flight
+    are held in memory.
+    """
+    scan = functools.partial(page_links, directory)
+    if processes == 1:
+        yield from map(scan, pages)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        yield from pool.imap_unordered(scan, pages, PAGES_PER_TASK)
+
+
+def corpus_links(page, links, corpus):
+    """
+    Yield (page, link) for the links that point to another page
+    in the corpus.
+    """
+    for link in sorted(links):
+        if link != page and link in corpus:
+            yield page, link
+
+
+if __name__ == "__main__":
+    main()
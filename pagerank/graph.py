@@ -0,0 +1,158 @@
+import os
+
+import numpy as np
+import scipy.sparse
+
+# file layout: a HEADER record, then link offsets, link targets,
+# page name offsets and UTF-8 page names, each 8-byte aligned
+MAGIC = b"PRGRAPH1"
+HEADER = np.dtype([("magic", "S8"), ("pages", "<i8"), ("links", "<i8"),
+                   ("names", "<i8")])
+
+
+class LinkGraph():
+    """
+    A corpus as a directed graph over pages numbered 0..N-1, with the
+    links out of page i stored in compressed sparse row (CSR) form as
+    indices[indptr[i]:indptr[i + 1]].
+    """
+
+    def __init__(self, pages, indptr, indices):
+        self.pages = pages
+        self.indptr = indptr
+        self.indices = indices
+        self.out_degree = np.diff(indptr)
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Builds a LinkGraph from a dictionary mapping each page
+        to the set of pages it links to, as returned by `crawl`.
+        """
+        pages = sorted(corpus)
+        numbers = {page: i for i, page in enumerate(pages)}
+        indptr = np.zeros(len(pages) + 1, dtype=np.int64)
+        indices = []
+        for i, page in enumerate(pages):
+            links = sorted(numbers[link] for link in corpus[page])
+            indices.extend(links)
+            indptr[i + 1] = indptr[i] + len(links)
+        return cls(pages, indptr, np.array(indices, dtype=np.int32))
+
+    @classmethod
+    def from_edges(cls, pages, edges):
+        """
+        Builds a LinkGraph over the page names in `pages` from an iterable
+        of (page, link) name pairs, without building per-page sets.
+        """
+        pages = sorted(pages)
+        numbers = {page: i for i, page in enumerate(pages)}
+        pairs = np.fromiter(
+            (number for page, link in edges
+             for number in (numbers[page], numbers[link])),
+            dtype=np.int64
+        ).reshape(-1, 2)
+        # sort by source then target, dropping repeated links
+        pairs = np.unique(pairs, axis=0)
+        counts = np.bincount(pairs[:, 0], minlength=len(pages))
+        indptr = np.concatenate([[0], np.cumsum(counts)])
+        return cls(pages, indptr, pairs[:, 1].astype(np.int32))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-maps a LinkGraph saved with `save`. Nothing is read until
+        it is used, and page names are decoded only when asked for.
+        """
+        header = np.fromfile(path, dtype=HEADER, count=1)[0]
+        if header["magic"] != MAGIC:
+            raise ValueError(f"{path} is not a saved link graph")
+        pages, links, names = (int(header["pages"]), int(header["links"]),
+                               int(header["names"]))
+        offset = HEADER.itemsize
+        arrays = []
+        for dtype, size in (("<i8", pages + 1), ("<i4", links),
+                            ("<i8", pages + 1), ("u1", names)):
+            arrays.append(np.memmap(path, dtype=dtype, mode="r",
+                                    offset=offset, shape=(size,)))
+            offset = aligned(offset + size * np.dtype(dtype).itemsize)
+        indptr, indices, name_offsets, blob = arrays
+        return cls(PageNames(name_offsets, blob), indptr, indices)
+
+    def save(self, path):
+        """
+        Writes the graph to `path` in a binary format that `load`
+        can memory-map.
+        """
+        encoded = [page.encode("utf-8") for page in self.pages]
+        name_offsets = np.concatenate(
+            [[0], np.cumsum([len(name) for name in encoded])]
+        ).astype("<i8")
+        header = np.array(
+            [(MAGIC, len(self.pages), len(self.indices), name_offsets[-1])],
+            dtype=HEADER
+        )
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(header.tobytes())
+            for section in (np.asarray(self.indptr, dtype="<i8"),
+                            np.asarray(self.indices, dtype="<i4"),
+                            name_offsets):
+                section.tofile(f)
+                f.write(bytes(aligned(f.tell()) - f.tell()))
+            f.write(b"".join(encoded))
+        os.replace(temporary, path)
+
+    def __len__(self):
+        return len(self.pages)
+
+    def dangling(self):
+        """
+        Returns a boolean mask of the pages with no links.
+        """
+        return self.out_degree == 0
+
+    def transition_matrix(self):
+        """
+        Returns the sparse N x N matrix M with M[j, i] = 1 / out_degree(i)
+        for every link i -> j, so that M @ ranks spreads each page's
+        rank evenly over its links. Columns of dangling pages are zero.
+        """
+        n = len(self.pages)
+        sources = np.repeat(np.arange(n), self.out_degree)
+        weights = 1 / self.out_degree[sources]
+        return scipy.sparse.csr_matrix(
+            (weights, (self.indices, sources)), shape=(n, n)
+        )
+
+    def ranks(self, vector):
+        """
+        Returns a dictionary mapping page names to values of `vector`.
+        """
+        return {page: float(value) for page, value in zip(self.pages, vector)}
+
+
+class PageNames():
+    """
+    Read-only sequence of page names stored as UTF-8 in one buffer,
+    decoded on access.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("page index out of range")
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.blob[start:end].tobytes().decode("utf-8")
+
+
+def aligned(offset):
+    return (offset + 7) // 8 * 8
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from crawler import corpus_pages, scan_pages
+from graph import LinkGraph
+from solvers import power_iteration
+
+# Links and ranks from the last run, kept in the corpus directory
+STATE = ".pagerank-state.json"
+
+
+def update_pagerank(directory, damping_factor, processes=None):
+    """
+    Return (ranks, stats) for the corpus in `directory`, reusing the
+    links and ranks saved by the previous call for the same directory.
+
+    Only pages whose size, modification time and then content hash
+    changed are rescanned, and power iteration starts from the previous
+    ranks. `stats` counts the pages "scanned" and "removed" and the
+    power iteration sweeps ("iterations").
+    """
+    path = os.path.join(directory, STATE)
+    previous = load_state(path)
+
+    # Reuse entries for pages whose contents are unchanged
+    pages = {}
+    changed = []
+    for page in corpus_pages(directory):
+        status = os.stat(os.path.join(directory, page))
+        entry = previous.get(page)
+        if (entry is not None and entry["size"] == status.st_size
+                and entry["mtime"] == status.st_mtime_ns):
+            pages[page] = entry
+            continue
+        digest = file_hash(os.path.join(directory, page))
+        if entry is None or entry["hash"] != digest:
+            entry = {"hash": digest, "links": [], "rank": None}
+            changed.append(page)
+        entry["size"] = status.st_size
+        entry["mtime"] = status.st_mtime_ns
+        pages[page] = entry
+
+    for page, links in scan_pages(directory, changed, processes):
+        pages[page]["links"] = sorted(links - {page})
+
+    # Links are saved unfiltered, since new pages can make them valid
+    corpus = {
+        page: {link for link in pages[page]["links"] if link in pages}
+        for page in pages
+    }
+    graph = LinkGraph.from_corpus(corpus)
+
+    # Start from the old ranks, giving new pages an even share
+    initial = np.array([
+        pages[page]["rank"] if pages[page]["rank"] is not None
+        else 1 / len(graph)
+        for page in graph.pages
+    ])
+    stats = {
+        "scanned": len(changed),
+        "removed": len(set(previous) - set(pages)),
+    }
+    ranks = power_iteration(graph, damping_factor,
+                            initial=initial, stats=stats)
+
+    for page, rank in zip(graph.pages, ranks):
+        pages[page]["rank"] = float(rank)
+    save_state(path, pages)
+    return graph.ranks(ranks), stats
+
+
+def load_state(path):
+    """
+    Return the saved page entries, or an empty dict if there are none.
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(path, pages):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as f:
+        json.dump(pages, f)
+    os.replace(temporary, path)
+
+
+def file_hash(path):
+    """
+    Return the SHA-256 digest of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -1,21 +1,102 @@
+import argparse
+import json
 import os
-import random
-import re
-import sys
+
+import numpy as np
+
+from crawler import corpus_pages, crawl_edges
+from graph import LinkGraph
+from incremental import update_pagerank
+from solvers import SOLVERS, personalized_pagerank, teleport_matrix
 
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Number of independent random surfers sampled side by side, and the
+# steps each takes before its pages are counted, so the uniform start
+# has been forgotten (its weight shrinks by DAMPING every step)
+WALKERS = 1000
+BURN_IN = 50
+
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
+    parser = argparse.ArgumentParser(description="Rank the pages of a corpus.")
+    parser.add_argument(
+        "corpus",
+        help="directory of HTML pages, or a link graph saved with --export"
+    )
+    parser.add_argument(
+        "--export", metavar="FILE",
+        help="crawl the corpus once and save its link graph to FILE"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="reuse links and ranks saved by the last incremental run, "
+             "rescanning only pages that changed"
+    )
+    parser.add_argument(
+        "--topics", metavar="FILE",
+        help="JSON object mapping topic names to lists of seed pages; "
+             "rank the corpus once for each topic"
+    )
+    parser.add_argument(
+        "--solver", choices=sorted(SOLVERS), default="power",
+        help="method used for the iterative ranks"
+    )
+    parser.add_argument(
+        "--processes", type=int, default=1,
+        help="worker processes for the gauss-seidel solver"
+    )
+    parser.add_argument(
+        "--extrapolate", type=int, default=0, metavar="SWEEPS",
+        help="apply Aitken extrapolation every SWEEPS (3 or more) "
+             "gauss-seidel sweeps"
+    )
+    args = parser.parse_args()
+    if 0 < args.extrapolate < 3:
+        parser.error("--extrapolate needs at least 3 sweeps")
+    options = {}
+    if args.solver == "gauss-seidel":
+        options = {"processes": args.processes,
+                   "extrapolate": args.extrapolate}
+
+    if args.incremental:
+        ranks, stats = update_pagerank(args.corpus, DAMPING)
+        print(f"Rescanned {stats['scanned']} pages, "
+              f"dropped {stats['removed']}")
+        print(f"PageRank Results from Iteration "
+              f"({stats['iterations']} sweeps)")
+        for page in sorted(ranks):
+            print(f"  {page}: {ranks[page]:.4f}")
+        return
+
+    if args.export:
+        pages = corpus_pages(args.corpus)
+        graph = LinkGraph.from_edges(pages, crawl_edges(args.corpus, pages=pages))
+        graph.save(args.export)
+        print(f"Saved {len(graph)} pages and {len(graph.indices)} links "
+              f"to {args.export}")
+        return
+
+    if os.path.isfile(args.corpus):
+        corpus = LinkGraph.load(args.corpus)
+    else:
+        corpus = crawl(args.corpus)
+
+    if args.topics:
+        with open(args.topics) as f:
+            topics = json.load(f)
+        for topic, ranks in topic_pagerank(corpus, DAMPING, topics).items():
+            print(f"PageRank Results for Topic {topic}")
+            for page in sorted(ranks):
+                print(f"  {page}: {ranks[page]:.4f}")
+        return
+
     ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
+    ranks = iterate_pagerank(corpus, DAMPING, args.solver, **options)
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
@@ -27,23 +108,11 @@ def crawl(directory):
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
     """
-    pages = dict()
-
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
-
-    # Only include links to other pages in the corpus
-    for filename in pages:
-        pages[filename] = set(
-            link for link in pages[filename]
-            if link in pages
-        )
+    pages = {filename: set() for filename in corpus_pages(directory)}
+
+    # Collect links between pages in the corpus as they are found
+    for page, link in crawl_edges(directory, pages=list(pages)):
+        pages[page].add(link)
 
     return pages
 
@@ -84,28 +153,52 @@ def sample_pagerank(corpus, damping_factor, n):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    `corpus` may also be a LinkGraph, such as one loaded from a file.
+    """
+    graph = as_graph(corpus)
+    return graph.ranks(random_walk(graph, damping_factor, n))
+
+
+def random_walk(graph, damping_factor, n, walkers=WALKERS,
+                burn_in=BURN_IN, seed=None):
+    """
+    Return the fraction of `n` samples spent on each page of a LinkGraph
+    by random surfers following the transition model.
+
+    Up to `walkers` surfers start on random pages and all take a step
+    at once, so each step is a handful of array operations whatever
+    the size of the corpus. Links are uniform, so a surfer picks one by
+    scaling a uniform draw by its page's out-degree into its CSR row.
+    Each surfer's first `burn_in` steps are not counted.
     """
-    # dictionary to store sample pagerank values
-    sample_pr = {}
-    for page in corpus:
-        sample_pr[page] = 0 
-    # first sample chosen at random
-    sample = random.choice(list(corpus))
-    for i in range(1,n):
-        dist = transition_model(corpus, sample, damping_factor)
-        for sample in sample_pr:
-            sample_pr[sample] = (((i-1) * sample_pr[sample]) + dist[sample]) / i
-        next_page = list(sample_pr.keys())
-        probability = list(sample_pr.values())
-        sample = random.choices(next_page, weights = probability)[0]
-    # normalising
-    total = sum(sample_pr.values())
-    for page in sample_pr.keys():
-        sample_pr[page] = sample_pr[page]/total
-    return sample_pr
-
-
-def iterate_pagerank(corpus, damping_factor):
+    rng = np.random.default_rng(seed)
+    pages = len(graph)
+    walkers = max(1, min(walkers, n))
+    visits = np.zeros(pages, dtype=np.int64)
+    position = rng.integers(pages, size=walkers)
+    remaining = n
+    while remaining > 0:
+        if burn_in > 0:
+            burn_in -= 1
+        else:
+            # the last round may only need some of the surfers' samples
+            counted = position[:remaining]
+            visits += np.bincount(counted, minlength=pages)
+            remaining -= len(counted)
+
+        # follow a link with probability `damping_factor` when there is
+        # one, otherwise jump to a page chosen uniformly at random
+        degree = graph.out_degree[position]
+        follow = (rng.random(walkers) < damping_factor) & (degree > 0)
+        step = rng.integers(pages, size=walkers)
+        offset = (rng.random(follow.sum()) * degree[follow]).astype(np.int64)
+        step[follow] = graph.indices[graph.indptr[position[follow]] + offset]
+        position = step
+    return visits / n
+
+
+def iterate_pagerank(corpus, damping_factor, solver="power", **options):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
@@ -113,32 +206,41 @@ def iterate_pagerank(corpus, damping_factor):
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
+
+    `corpus` may also be a LinkGraph, such as one loaded from a file.
+    `solver` names one of solvers.SOLVERS, which is passed `options`.
     """
-    pages = len(corpus)
-    iterate_pr = {}
-    for page in corpus:
-        iterate_pr[page] = (1/pages)
-    # boolean variable to check if difference between current and new rpagerank values is > 0.001
-    diff = True
-    #iterate till difference becomes < 0.001
-    while diff:
-        old_pr = dict(iterate_pr)
-        for page in iterate_pr:
-            # creating a list of pages linked to a page
-            linked_pages = []
-            for _page in corpus:
-                if page in corpus[_page]:
-                    linked_pages.append(_page)
-            calculated_sum = 0
-            for _page in linked_pages:
-                calculated_sum += iterate_pr[_page] / len(corpus[_page])
-            iterate_pr[page] =  ((1-damping_factor)/pages) + (damping_factor * calculated_sum)
-            diff = bool(abs(old_pr[page]-iterate_pr[page]) > 0.001)
-    # normalising
-    total = sum(iterate_pr.values())
-    for page in iterate_pr.keys():
-        iterate_pr[page] = iterate_pr[page]/total
-    return iterate_pr
+    graph = as_graph(corpus)
+    return graph.ranks(SOLVERS[solver](graph, damping_factor, **options))
+
+
+def topic_pagerank(corpus, damping_factor, topics):
+    """
+    Return topic-sensitive PageRank values for a dictionary mapping
+    topic names to collections of seed pages.
+
+    Each topic's random surfer jumps only to that topic's seed pages.
+    All topics are solved in one batch of power iterations. Return a
+    dictionary mapping each topic to a dictionary of page ranks.
+    """
+    graph = as_graph(corpus)
+    names = list(topics)
+    teleports = teleport_matrix(graph, [topics[name] for name in names])
+    ranks = personalized_pagerank(graph, damping_factor, teleports)
+    return {
+        name: graph.ranks(ranks[:, k]) for k, name in enumerate(names)
+    }
+
+
+def as_graph(corpus):
+    """
+    Return `corpus` as a LinkGraph, converting it from a dictionary
+    of links if needed.
+    """
+    if isinstance(corpus, LinkGraph):
+        return corpus
+    return LinkGraph.from_corpus(corpus)
+
 
 if __name__ == "__main__":
     main()